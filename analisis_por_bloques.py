@@ -0,0 +1,475 @@
+"""
+analisis_por_bloques.py
+=======================
+Modo de memoria acotada del analizador (--memoria-max MB).
+
+El análisis normal carga el histórico entero en un DataFrame. Acá los tiers
+se leen por bloques de filas y se procesan día por día, en orden, reteniendo
+sólo el estado que necesitan las salidas:
+
+  - el día anterior (variaciones diarias de gráficos y rollups)
+  - las fechas de referencia de resumen y rankings (hoy, ayer, -30d, -365d)
+  - la variación media por fecha (total, por categoría y, con --rollup, por
+    nivel de rollup)
+  - el cache de tamaños y, con --rollup, los pares (marca, sku_id)
+
+Las salidas son las mismas que las de calcular_salidas. La escritura del
+histórico también es por bloques: el día se agrega al final de
+precios_compacto.csv y la compactación reparte filas entre tiers sin cargar
+ningún archivo entero.
+
+Si el estado retenido más el bloque en lectura supera el límite, el análisis
+se corta con MemoryError en vez de dejar que el runner mate el proceso.
+
+Para la web (generar_web_jumbo.py --memoria-max) hay lectores que traen sólo
+las filas de algunas fechas o de un lote de prefijos de sku_id por pasada.
+"""
+
+import os
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+import analizar_precios_jumbo as apj
+import historico_db
+from perfilador import Perfilador
+
+MB = 1024 * 1024
+
+FRACCION_BLOQUE = 0.2      # parte del límite reservada al bloque de read_csv en curso
+FILAS_BLOQUE_MIN = 1000
+FACTOR_TRABAJO = 4         # copias intermedias por fila de un lote de SKUs (orden, deltas, groupby)
+MARGEN_LOTE = 0.8          # los lotes usan hasta esta parte de la memoria libre (la estimación por fila es aproximada)
+
+# Columnas que se retienen del día anterior y de las fechas de referencia
+COLS_PAR = ["sku_id", "fecha", "precio_actual", "cat_principal"]   # + COLUMNAS_ROLLUP con rollup
+COLS_REF = ["sku_id", "fecha", "cat_principal", "precio_actual", "precio_unitario", "cantidad"]
+COLS_HIST = ["sku_id", "nombre", "marca", "categoria", "cat_padre", "cat_principal",
+             "precio_actual", "precio_regular", "fecha"]
+
+
+def tamano(obj):
+    """Bytes aproximados de DataFrames / Series (también dentro de listas y dicts)."""
+    if isinstance(obj, dict):
+        return sum(tamano(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(tamano(v) for v in obj)
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(index=True, deep=True))
+    return 0
+
+
+class PresupuestoMemoria:
+    """
+    Lleva la cuenta del estado retenido por componente y corta si, sumado al
+    bloque de lectura, supera el límite. El tamaño de cada componente se mide
+    al registrarlo (no en cada control) porque medir strings es caro.
+    """
+
+    def __init__(self, limite_mb, bytes_por_fila):
+        self.limite = int(limite_mb * MB)
+        self.bytes_por_fila = bytes_por_fila
+        self.filas_bloque = max(FILAS_BLOQUE_MIN, int(self.limite * FRACCION_BLOQUE / max(bytes_por_fila, 1)))
+        self.bytes_bloque = int(self.filas_bloque * bytes_por_fila)
+        self.componentes = {}
+        self.pico = 0
+
+    def registrar(self, nombre, obj):
+        self.componentes[nombre] = tamano(obj)
+
+    def sumar(self, nombre, obj):
+        # Para componentes que sólo crecen (listas de agregados por fecha)
+        self.componentes[nombre] = self.componentes.get(nombre, 0) + tamano(obj)
+
+    def controlar(self, etapa):
+        usado = sum(self.componentes.values()) + self.bytes_bloque
+        self.pico = max(self.pico, usado)
+        if usado > self.limite:
+            detalle = ", ".join(f"{k}={v / MB:.0f}MB" for k, v in
+                                sorted(self.componentes.items(), key=lambda kv: -kv[1])[:5])
+            raise MemoryError(
+                f"{etapa}: el estado retenido ({usado / MB:.0f} MB, bloque de lectura incluido) "
+                f"supera --memoria-max {self.limite / MB:.0f} MB [{detalle}]")
+
+
+def leer_bloques(ruta, filas_bloque, **kwargs):
+    if not Path(ruta).exists():
+        return
+    yield from pd.read_csv(ruta, encoding="utf-8-sig", dtype={"sku_id": str},
+                           chunksize=filas_bloque, **kwargs)
+
+
+def contar_fechas(rutas, filas_bloque, columnas=("fecha",)):
+    """Cantidad de filas por fecha (o por fecha y columnas extra) leyendo sólo esas columnas."""
+    conteo = Counter()
+    for ruta in rutas:
+        for bloque in leer_bloques(ruta, filas_bloque, usecols=list(columnas)):
+            conteo.update(bloque.value_counts(list(columnas), dropna=False).to_dict())
+    if len(columnas) == 1:
+        return Counter({k[0] if isinstance(k, tuple) else k: v for k, v in conteo.items()})
+    return conteo
+
+
+def fecha_referencia(fechas, dias):
+    """Última fecha de `fechas` (ordenadas) a `dias` o más de la última, como calcular_ranking."""
+    if len(fechas) < 2:
+        return None
+    objetivo = (datetime.strptime(fechas[-1], "%Y-%m-%d") - timedelta(days=dias)).strftime("%Y-%m-%d")
+    disp = [f for f in fechas if f <= objetivo]
+    return disp[-1] if disp else None
+
+
+# ──────────────────────────────────────────────
+# Escritura del histórico
+# ──────────────────────────────────────────────
+def _columnas_csv(ruta):
+    return list(pd.read_csv(ruta, encoding="utf-8-sig", nrows=0).columns)
+
+
+def _repartir(origenes, destinos, columnas, filas_bloque):
+    """
+    Reescribe cada archivo de `destinos` ({ruta: fechas}) con las filas de
+    `origenes` (en ese orden) cuya fecha le corresponde. Se escribe a un
+    temporal y se reemplaza al final, así un origen puede ser también destino.
+    """
+    tmps = {ruta: Path(f"{ruta}.tmp") for ruta in destinos}
+    archivos = {ruta: open(tmp, "w", encoding="utf-8-sig", newline="") for ruta, tmp in tmps.items()}
+    try:
+        for f in archivos.values():
+            pd.DataFrame(columns=columnas).to_csv(f, index=False)
+        for origen in origenes:
+            for bloque in leer_bloques(origen, filas_bloque):
+                for ruta, fechas in destinos.items():
+                    sub = bloque[bloque["fecha"].isin(fechas)]
+                    if not sub.empty:
+                        sub.reindex(columns=columnas).to_csv(archivos[ruta], header=False, index=False)
+    finally:
+        for f in archivos.values():
+            f.close()
+    for ruta, tmp in tmps.items():
+        os.replace(tmp, ruta)
+
+
+def agregar_dia(df_hoy, filas_bloque, ruta=apj.PRECIOS_COMPACTO):
+    """
+    Equivalente por bloques de actualizar_historico: si la fecha de hoy no
+    está en el archivo y las columnas coinciden, sólo agrega las filas al
+    final; si no, reescribe el archivo por bloques sin esa fecha.
+    """
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    fecha_hoy = df_hoy["fecha"].iloc[0]
+    if not ruta.exists():
+        df_hoy.to_csv(ruta, index=False, encoding="utf-8-sig")
+        return Counter({fecha_hoy: len(df_hoy)})
+
+    conteo = contar_fechas([ruta], filas_bloque)
+    columnas = _columnas_csv(ruta)
+    if fecha_hoy in conteo or columnas != list(df_hoy.columns):
+        columnas += [c for c in df_hoy.columns if c not in columnas]
+        conteo.pop(fecha_hoy, None)
+        _repartir([ruta], {ruta: set(conteo)}, columnas, filas_bloque)
+    with open(ruta, "a", encoding="utf-8", newline="") as f:
+        df_hoy.reindex(columns=columnas).to_csv(f, header=False, index=False)
+    conteo[fecha_hoy] = len(df_hoy)
+    print(f"  Histórico actualizado (por bloques): {sum(conteo.values())} filas totales")
+    return conteo
+
+
+def compactar(fechas_diario, fecha_hoy, filas_bloque):
+    """Misma política de retención que compactar_historico, repartiendo filas por bloques."""
+    hoy = datetime.strptime(fecha_hoy, "%Y-%m-%d")
+    corte_diario  = (hoy - timedelta(days=apj.RETENCION_DIARIA)).strftime("%Y-%m-%d")
+    corte_semanal = (hoy - timedelta(days=apj.RETENCION_SEMANAL)).strftime("%Y-%m-%d")
+
+    vencidos = {f for f in fechas_diario if f < corte_diario}
+    if not vencidos:
+        return
+    fechas_semanal = set(contar_fechas([apj.PRECIOS_SEMANAL], filas_bloque))
+    fechas_mensual = set(contar_fechas([apj.PRECIOS_MENSUAL], filas_bloque))
+
+    semanal = apj.ultimas_por_periodo(fechas_semanal | vencidos, "%G-%V")
+    vencidos_s = {f for f in semanal if f < corte_semanal}
+    destinos = {
+        apj.PRECIOS_COMPACTO: set(fechas_diario) - vencidos,
+        apj.PRECIOS_SEMANAL:  semanal - vencidos_s,
+    }
+    if vencidos_s:
+        destinos[apj.PRECIOS_MENSUAL] = apj.ultimas_por_periodo(fechas_mensual | vencidos_s, "%Y-%m")
+
+    origenes = [apj.PRECIOS_MENSUAL, apj.PRECIOS_SEMANAL, apj.PRECIOS_COMPACTO]
+    columnas = []
+    for ruta in origenes:
+        if ruta.exists():
+            columnas += [c for c in _columnas_csv(ruta) if c not in columnas]
+    _repartir(origenes, destinos, columnas, filas_bloque)
+    n_mensual = len(destinos.get(apj.PRECIOS_MENSUAL, fechas_mensual))
+    print(f"  Histórico compactado: {len(destinos[apj.PRECIOS_COMPACTO])} días diarios · "
+          f"{len(destinos[apj.PRECIOS_SEMANAL])} semanales · {n_mensual} mensuales")
+
+
+# ──────────────────────────────────────────────
+# Lectura día por día
+# ──────────────────────────────────────────────
+class LectorDias:
+    """
+    Recorre los tiers por bloques y entrega (fecha, df_dia) en orden de
+    fecha. Un día se entrega cuando llegaron todas sus filas (según el
+    conteo previo); con archivos ordenados por fecha, como los que escribe
+    el analizador, el buffer nunca pasa de un día más un bloque.
+    """
+
+    def __init__(self, rutas, filas_por_fecha, filas_bloque, presupuesto):
+        self.rutas = rutas
+        self.filas = filas_por_fecha
+        self.filas_bloque = filas_bloque
+        self.presupuesto = presupuesto
+        self.buffer = {}
+
+    def __iter__(self):
+        orden = sorted(self.filas)
+        siguiente = 0
+        completas = {}
+        for ruta in self.rutas:
+            for bloque in leer_bloques(ruta, self.filas_bloque):
+                for fecha, parte in bloque.groupby("fecha", sort=False):
+                    self.buffer.setdefault(fecha, []).append(parte)
+                    if sum(len(p) for p in self.buffer[fecha]) >= self.filas[fecha]:
+                        completas[fecha] = self.buffer.pop(fecha)
+                self.presupuesto.registrar("lectura", [self.buffer, completas])
+                self.presupuesto.controlar("lectura del histórico")
+                while siguiente < len(orden) and orden[siguiente] in completas:
+                    fecha = orden[siguiente]
+                    partes = completas.pop(fecha)
+                    siguiente += 1
+                    yield fecha, pd.concat(partes, ignore_index=True)
+                self.presupuesto.registrar("lectura", [self.buffer, completas])
+        if siguiente < len(orden):
+            raise RuntimeError(f"Histórico inconsistente: faltan filas de {orden[siguiente]} "
+                               f"(¿cambiaron los CSV durante el análisis?)")
+
+
+def preparar_dia(df, cache):
+    """Columnas y tipos del histórico unificado + precio unitario (sin releer el cache)."""
+    df = df.reindex(columns=COLS_HIST)
+    for c in ["nombre", "marca", "categoria", "cat_padre", "cat_principal"]:
+        df[c] = df[c].astype(object)
+    for c in ["precio_actual", "precio_regular"]:
+        df[c] = pd.to_numeric(df[c], errors="coerce").astype(float)
+    cache, nuevos = apj.completar_cache_unidades(cache, df, verbose=False)
+    return apj.unir_precio_unitario(df, cache), cache, nuevos
+
+
+def calcular_salidas_por_bloques(filas_por_cat, presupuesto, perfil=None, rollup=False):
+    """
+    Igual que calcular_salidas, pero recorriendo el histórico día por día.
+    `filas_por_cat` es {(fecha, cat_principal): filas} de los tiers.
+    """
+    perfil = perfil or Perfilador()
+    # Sin rollup el día anterior sólo necesita cat_principal (gráficos)
+    cols_par = COLS_PAR + [c for c in apj.COLUMNAS_ROLLUP if rollup and c not in COLS_PAR]
+    extra = cols_par[3:]
+    filas_por_fecha = Counter()
+    fechas_cat = {}
+    for (fecha, cat), n in filas_por_cat.items():
+        filas_por_fecha[fecha] += n
+        fechas_cat.setdefault(cat, set()).add(fecha)
+    fechas = sorted(filas_por_fecha)
+    cats_presentes = [c for c in apj.ORDEN_CATS if c in fechas_cat]
+
+    # Fechas cuyas filas hay que guardar enteras para resumen y rankings
+    referencias = set(fechas[-2:])
+    referencias |= {fecha_referencia(fechas, d) for d in {1, *apj.RANKINGS.values()}}
+    for cat in cats_presentes:
+        fc = sorted(fechas_cat[cat])
+        referencias |= {fc[-1], fecha_referencia(fc, 1)}
+    referencias.discard(None)
+
+    # Fechas cuya variación contra el día anterior entra en gráficos o rollups
+    con_var_graficos, con_var_rollup = set(), set()
+    if len(fechas) >= 2:
+        for dias in apj.PERIODOS.values():
+            con_var_graficos |= set(apj.rango_fechas(fechas, dias)[1:])
+        if rollup:
+            con_var_rollup = set(apj.rango_fechas(fechas, apj.ROLLUP_DIAS)[1:])
+
+    print(f"\n4. Recorriendo el histórico por días ({len(fechas)} fechas, "
+          f"bloques de {presupuesto.filas_bloque} filas)...")
+    cache = apj.cargar_cache_unidades()
+    n_nuevos = 0
+    presupuesto.registrar("cache_unidades", cache)
+    snapshots, medias_total, medias_cat = [], [], []
+    aggs = {nivel: [] for nivel in apj.NIVELES_ROLLUP}
+    skus_marca = None
+    anterior = fecha_anterior = None
+
+    with perfil.etapa("recorrido", fechas=len(fechas)):
+        lector = LectorDias(apj.TIERS_HISTORICO, filas_por_fecha, presupuesto.filas_bloque, presupuesto)
+        for fecha, df_dia in lector:
+            df_dia, cache, nuevos = preparar_dia(df_dia, cache)
+            if nuevos:
+                n_nuevos += nuevos
+                presupuesto.registrar("cache_unidades", cache)
+            presupuesto.registrar("dia", df_dia)
+
+            if anterior is not None and (fecha in con_var_graficos or fecha in con_var_rollup):
+                par = pd.concat([anterior, df_dia[cols_par]], ignore_index=True)
+                merged = apj.variaciones_diarias(par, [fecha_anterior, fecha], extra)
+                if fecha in con_var_graficos:
+                    medias_total.append(merged.groupby("fecha")["diff_pct"].mean())
+                    medias_cat.append(merged.groupby(["cat_principal", "fecha"])["diff_pct"].mean())
+                    presupuesto.sumar("medias", [medias_total[-1], medias_cat[-1]])
+                if fecha in con_var_rollup:
+                    agg_dia, marcas = apj.agregar_rollup(merged)
+                    for nivel, agg in agg_dia.items():
+                        aggs[nivel].append(agg)
+                    presupuesto.sumar("rollup", agg_dia)
+                    skus_marca = pd.concat([skus_marca, marcas], ignore_index=True).drop_duplicates()
+                    presupuesto.registrar("rollup_marcas", skus_marca)
+
+            if fecha in referencias:
+                snapshots.append(df_dia if fecha == fechas[-1] else df_dia[COLS_REF])
+                presupuesto.sumar("referencias", snapshots[-1])
+            anterior, fecha_anterior = df_dia[cols_par], fecha
+            presupuesto.registrar("dia_anterior", anterior)
+            presupuesto.controlar(f"día {fecha}")
+        presupuesto.componentes.pop("dia", None)
+
+    if n_nuevos:
+        apj.guardar_cache_unidades(cache)
+        print(f"  Tamaños parseados: {n_nuevos} nombres nuevos")
+
+    df_ref = pd.concat(snapshots, ignore_index=True) if snapshots else pd.DataFrame()
+    print(f"\n5. Calculando resumen, gráficos{', rankings y rollups' if rollup else ' y rankings'}...")
+    with perfil.etapa("resumen", filas=len(df_ref)):
+        resumen = apj.calcular_resumen(df_ref, cats_presentes)
+
+    with perfil.etapa("graficos"):
+        graficos = {}
+        for key, dias in apj.PERIODOS.items():
+            if len(fechas) < 2:
+                graficos[key] = {"total": [], "categorias": {}}
+                continue
+            media_total = pd.concat(medias_total) if medias_total else pd.Series(dtype=float)
+            media_cat = pd.concat(medias_cat).sort_index() if medias_cat else pd.Series(dtype=float)
+            graficos[key] = apj.armar_graficos(media_total, media_cat,
+                                               apj.rango_fechas(fechas, dias), cats_presentes)
+
+    with perfil.etapa("rankings"):
+        rankings = {key: apj.calcular_ranking(df_ref, dias) for key, dias in apj.RANKINGS.items()}
+
+    cubo = {}
+    if rollup:
+        with perfil.etapa("rollup"):
+            if len(fechas) < 2:
+                cubo = {nivel: {"fechas": fechas, "grupos": {}} for nivel in apj.NIVELES_ROLLUP}
+            else:
+                cubo = apj.armar_rollup({nivel: pd.concat(a) for nivel, a in aggs.items()},
+                                        skus_marca, apj.rango_fechas(fechas, apj.ROLLUP_DIAS))
+
+    return apj.empaquetar_salidas(resumen, graficos, rankings, cubo)
+
+
+def ejecutar(df_hoy, memoria_max, perfil=None, rollup=False):
+    """
+    Pasos 3–7 del analizador con memoria acotada: agrega df_hoy al
+    histórico, compacta, sincroniza el índice SQLite (si existe) y calcula
+    las salidas (con los rollups sólo si rollup).
+    """
+    perfil = perfil or Perfilador()
+    fecha_hoy = df_hoy["fecha"].iloc[0]
+    bytes_por_fila = tamano(df_hoy) / max(len(df_hoy), 1)
+    presupuesto = PresupuestoMemoria(memoria_max, bytes_por_fila)
+
+    print(f"\n3. Actualizando histórico por bloques (memoria máx. {memoria_max} MB)...")
+    with perfil.etapa("actualizar_historico"):
+        fechas_diario = agregar_dia(df_hoy, presupuesto.filas_bloque)
+    # El índice SQLite es opcional: sólo se sincroniza si ya existe (ver actualizar_historico)
+    ruta_db = apj.PRECIOS_COMPACTO.parent / historico_db.NOMBRE_DB
+    if ruta_db.exists():
+        with perfil.etapa("sqlite"):
+            con = historico_db.conectar(ruta_db)
+            faltan = set(fechas_diario) - set(historico_db.fechas_cargadas(con)) - {fecha_hoy}
+            con.close()
+            bloques = leer_bloques(apj.PRECIOS_COMPACTO, presupuesto.filas_bloque) if faltan else None
+            historico_db.sincronizar(df_hoy, bloques, ruta_db)
+    with perfil.etapa("compactar_historico"):
+        compactar(fechas_diario, fecha_hoy, presupuesto.filas_bloque)
+
+    with perfil.etapa("contar_fechas"):
+        filas_por_cat = contar_fechas(apj.TIERS_HISTORICO, presupuesto.filas_bloque,
+                                      ("fecha", "cat_principal"))
+    salidas = calcular_salidas_por_bloques(filas_por_cat, presupuesto, perfil, rollup)
+    print(f"   Estado retenido máximo: {presupuesto.pico / MB:.0f} MB de {memoria_max} MB")
+    return salidas
+
+
+# ──────────────────────────────────────────────
+# Lectura para la web (historial por SKU y buscador)
+# ──────────────────────────────────────────────
+def bytes_por_fila(rutas, muestra=5000):
+    """Bytes en memoria por fila del histórico, medidos sobre las primeras filas."""
+    for ruta in rutas:
+        if Path(ruta).exists():
+            df = pd.read_csv(ruta, encoding="utf-8-sig", dtype={"sku_id": str}, nrows=muestra)
+            if len(df):
+                return tamano(df) / len(df)
+    return 1
+
+
+def contar_prefijos(rutas, filas_bloque, largo):
+    """(fechas ordenadas, {prefijo de sku_id: filas}) leyendo sólo sku_id y fecha."""
+    fechas, filas = set(), Counter()
+    for ruta in rutas:
+        for bloque in leer_bloques(ruta, filas_bloque, usecols=["sku_id", "fecha"]):
+            fechas.update(bloque["fecha"].unique())
+            filas.update(bloque["sku_id"].str[:largo].value_counts().to_dict())
+    return sorted(fechas), filas
+
+
+def leer_filtrado(rutas, presupuesto, filtro, etapa):
+    """Filas de los tiers donde filtro(bloque) es True, cortando si no entran en el presupuesto."""
+    partes = []
+    for ruta in rutas:
+        for bloque in leer_bloques(ruta, presupuesto.filas_bloque):
+            parte = bloque[filtro(bloque)]
+            if not parte.empty:
+                partes.append(parte)
+                presupuesto.sumar(etapa, parte)
+                presupuesto.controlar(etapa)
+    if not partes:
+        return pd.DataFrame(columns=COLS_HIST)
+    return pd.concat(partes, ignore_index=True)
+
+
+def lotes_por_prefijo(prefijos, filas_por_prefijo, presupuesto, largo):
+    """
+    Reparte `prefijos` en lotes cuyas filas (más las copias de trabajo)
+    entran en lo que queda del presupuesto y entrega (lote, df) con una
+    pasada por los tiers por lote.
+    """
+    libre = presupuesto.limite - presupuesto.bytes_bloque - sum(presupuesto.componentes.values())
+    max_filas = max(1, int(libre * MARGEN_LOTE / (presupuesto.bytes_por_fila * FACTOR_TRABAJO)))
+    lotes, actual, n = [], [], 0
+    for pref in sorted(prefijos):
+        filas = filas_por_prefijo.get(pref, 0)
+        if actual and n + filas > max_filas:
+            lotes.append(actual)
+            actual, n = [], 0
+        actual.append(pref)
+        n += filas
+    if actual:
+        lotes.append(actual)
+
+    for lote in lotes:
+        conjunto = set(lote)
+        df = leer_filtrado(apj.TIERS_HISTORICO, presupuesto,
+                           lambda b: b["sku_id"].str[:largo].isin(conjunto), "lote_skus")
+        presupuesto.componentes["lote_skus"] = tamano(df) * FACTOR_TRABAJO
+        presupuesto.controlar(f"historial por SKU ({len(lote)} prefijos, {len(df)} filas)")
+        yield lote, df
+        presupuesto.registrar("lote_skus", None)
@@ -2,23 +2,51 @@
 analizar_precios_jumbo.py
 =========================
 Lee output_jumbo/*.csv del día, guarda histórico en
-data/precios_compacto.csv y genera los JSONs para la web.
+data/precios_compacto.csv (+ tiers semanal/mensual) y genera los JSONs para la web.
 
 - Una fila por producto por día
 - Índices % acumulados día a día
 - Comparaciones vs día/7d/30d/6m/1y
 - Categorías principales (usa cat_principal del CSV directamente)
+- Modo as-of / backfill para reconstruir salidas de fechas pasadas
+- Comparación de precios entre tiendas (columna "tienda" del scraper)
+
+Uso:
+    python analizar_precios_jumbo.py              # corrida normal
+    python analizar_precios_jumbo.py --profile    # + reporte de tiempos/memoria
+    python analizar_precios_jumbo.py --profile --cprofile   # + volcados .prof
+    python analizar_precios_jumbo.py --as-of 2026-02-21     # salidas de esa fecha
+    python analizar_precios_jumbo.py --backfill 2026-01-01 2026-12-31 --workers 4
+    python analizar_precios_jumbo.py --memoria-max 1500   # histórico por bloques, ≤ 1.5 GB
 """
 
+import argparse
 import json
 import glob
+import multiprocessing
+import os
+import re
+import time
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from pathlib import Path
 import sys
 
+import historico_db
+from perfilador import Perfilador
+
 DIR_DATA         = Path("data")
 PRECIOS_COMPACTO = DIR_DATA / "precios_compacto.csv"
+DIR_PERFIL       = DIR_DATA / "perfil"
+PRECIOS_SEMANAL  = DIR_DATA / "precios_semanal.csv"
+PRECIOS_MENSUAL  = DIR_DATA / "precios_mensual.csv"
+TIERS_HISTORICO  = [PRECIOS_MENSUAL, PRECIOS_SEMANAL, PRECIOS_COMPACTO]   # de más viejo a más nuevo
+DIR_ASOF         = DIR_DATA / "asof"
+CACHE_UNIDADES   = DIR_DATA / "unidades_cache.csv"
+# Los rollups (varios MB que cambian enteros cada día, sólo con --rollup) no van
+# a data/, que se commitea
+DIR_ROLLUP       = Path("output_jumbo") / "rollup"
 
 # Estas categorías deben coincidir exactamente con los nombres nivel-1
 # que devuelve el árbol de Jumbo (el scraper los guarda en cat_principal)
@@ -41,7 +69,31 @@ ORDEN_CATS = [
     "Tiempo Libre",
 ]
 
+# Tienda (contexto VTEX) que alimenta el histórico; las demás que traiga el
+# scraper sólo se comparan contra ella en comparacion_tiendas.json
+TIENDA_BASE = "jumbo"
+
 PERIODOS = {"7d": 7, "30d": 30, "6m": 180, "1y": 365}
+RANKINGS = {"dia": 1, "mes": 30, "anio": 365}
+
+# Retención del histórico (ver compactar_historico). El tier semanal cubre un
+# año más una semana para que el ranking de 365 días encuentre su fecha de referencia.
+RETENCION_DIARIA  = 92
+RETENCION_SEMANAL = 372
+
+# Niveles del rollup: columnas que forman la clave de cada grupo.
+# Los niveles del árbol incluyen a sus ancestros para no mezclar
+# subcategorías homónimas de distintas cat_principal.
+NIVELES_ROLLUP = {
+    "cat_principal": ["cat_principal"],
+    "cat_padre":     ["cat_principal", "cat_padre"],
+    "categoria":     ["cat_principal", "cat_padre", "categoria"],
+    "marca":         ["marca"],
+}
+COLUMNAS_ROLLUP  = sorted({c for cols in NIVELES_ROLLUP.values() for c in cols})
+SEP_NIVEL        = " > "
+ROLLUP_DIAS      = 365
+MIN_SKUS_MARCA   = 5     # marcas con menos SKUs no se publican en rollup_marca
 
 
 def cargar_csvs_hoy():
@@ -68,32 +120,279 @@ def preparar_df_dia(df_raw, fecha_str):
     # Usar cat_principal directamente del CSV (viene del nivel 1 del árbol de Jumbo)
     # Si por algún motivo está vacía, marcamos como "Otros"
     df["cat_principal"] = df["cat_principal"].fillna("Otros").replace("", "Otros")
+    if "cat_padre" not in df.columns:
+        df["cat_padre"] = "Otros"
+    df["cat_padre"] = df["cat_padre"].fillna("Otros").replace("", "Otros")
 
     df["precio_actual"] = pd.to_numeric(df["precio_actual"], errors="coerce")
     df = df.dropna(subset=["precio_actual"])
     df = df[df["precio_actual"] > 0]
     df["sku_id"] = df["sku_id"].astype(str)
     df = df.drop_duplicates(subset=["sku_id", "fecha"], keep="last")
-    return df[["sku_id", "nombre", "marca", "categoria", "cat_principal",
+    return df[["sku_id", "nombre", "marca", "categoria", "cat_padre", "cat_principal",
                "precio_actual", "precio_regular", "fecha"]]
 
 
-def actualizar_historico(df_hoy):
-    DIR_DATA.mkdir(exist_ok=True)
-    if PRECIOS_COMPACTO.exists():
-        df_hist = pd.read_csv(PRECIOS_COMPACTO, encoding="utf-8-sig",
-                              dtype={"sku_id": str})
+def separar_tiendas(df_raw):
+    """(filas de TIENDA_BASE, {tienda: filas}) según la columna "tienda" (CSVs viejos: todo base)."""
+    if "tienda" not in df_raw.columns:
+        return df_raw, {}
+    tienda = df_raw["tienda"].fillna(TIENDA_BASE).replace("", TIENDA_BASE)
+    otras = {t: df_raw[tienda == t] for t in sorted(tienda.unique()) if t != TIENDA_BASE}
+    return df_raw[tienda == TIENDA_BASE], otras
+
+
+def calcular_comparacion_tiendas(df_base, otras, top_n=20):
+    """
+    Precio de cada tienda contra TIENDA_BASE en el mismo día, sobre los SKUs
+    que están en ambas. diff_pct > 0: la tienda es más cara que la base.
+    """
+    base = df_base[["sku_id", "nombre", "marca", "cat_principal", "precio_actual"]].rename(
+        columns={"precio_actual": "precio_base"})
+    tiendas = {}
+    for tienda, df_t in otras.items():
+        m = base.merge(df_t[["sku_id", "precio_actual"]].rename(columns={"precio_actual": "precio_tienda"}),
+                       on="sku_id")
+        m["diff_pct"] = (m["precio_tienda"] - m["precio_base"]) / m["precio_base"] * 100
+        por_cat = m.groupby("cat_principal")["diff_pct"].agg(["mean", "size"])
+        tiendas[tienda] = {
+            "skus_comunes":       int(len(m)),
+            "skus_solo_tienda":   int(len(df_t) - len(m)),
+            "diff_pct_promedio":  round(m["diff_pct"].mean(), 2) if len(m) else None,
+            "mas_caros":          int((m["diff_pct"] > 0).sum()),
+            "mas_baratos":        int((m["diff_pct"] < 0).sum()),
+            "iguales":            int((m["diff_pct"] == 0).sum()),
+            "categorias": [
+                {"categoria": c, "skus": int(por_cat.at[c, "size"]),
+                 "diff_pct_promedio": round(por_cat.at[c, "mean"], 2)}
+                for c in ORDEN_CATS if c in por_cat.index
+            ],
+            "mayores_diferencias": _registros(
+                m.loc[m["diff_pct"].abs().sort_values(ascending=False).index[:top_n]]),
+        }
+    return {
+        "fecha":       df_base["fecha"].iloc[0] if len(df_base) else None,
+        "tienda_base": TIENDA_BASE,
+        "tiendas":     tiendas,
+    }
+
+
+def leer_csv_historico(ruta):
+    return pd.read_csv(ruta, encoding="utf-8-sig", dtype={"sku_id": str})
+
+
+def cargar_historico():
+    """
+    Histórico unificado (mensual + semanal + diario). Los tiers no se solapan
+    en fechas, así que las funciones de cálculo reciben un único DataFrame
+    con resolución decreciente hacia el pasado. Todas las salidas diarias
+    (gráfico y ranking de 1 año incluidos) necesitan los tres tiers.
+    """
+    dfs = [leer_csv_historico(r) for r in TIERS_HISTORICO if Path(r).exists()]
+    if not dfs:
+        return pd.DataFrame()
+    return pd.concat(dfs, ignore_index=True)
+
+
+def ultimas_por_periodo(fechas, clave):
+    # Última fecha disponible de cada período (semana / mes)
+    fechas = pd.Series(sorted(fechas), dtype=object)
+    if fechas.empty:
+        return set()
+    periodos = pd.to_datetime(fechas).dt.strftime(clave)
+    return set(fechas.groupby(periodos.to_numpy()).max())
+
+
+def _snapshots(df, clave):
+    return df[df["fecha"].isin(ultimas_por_periodo(df["fecha"].unique(), clave))]
+
+
+def compactar_historico(df_diario, fecha_hoy=None):
+    """
+    Política de retención:
+      - últimos RETENCION_DIARIA días  → diario  (precios_compacto.csv)
+      - hasta RETENCION_SEMANAL días    → semanal (precios_semanal.csv, último día de cada semana ISO)
+      - más viejo                       → mensual (precios_mensual.csv, último día de cada mes)
+    Mueve lo que venció de cada tier al siguiente y devuelve el histórico
+    unificado (ver cargar_historico). Sólo reescribe los archivos que cambian.
+    """
+    if df_diario.empty:
+        return df_diario
+    fecha_hoy = fecha_hoy or df_diario["fecha"].max()
+    hoy = datetime.strptime(fecha_hoy, "%Y-%m-%d")
+    corte_diario  = (hoy - timedelta(days=RETENCION_DIARIA)).strftime("%Y-%m-%d")
+    corte_semanal = (hoy - timedelta(days=RETENCION_SEMANAL)).strftime("%Y-%m-%d")
+
+    df_semanal = leer_csv_historico(PRECIOS_SEMANAL) if PRECIOS_SEMANAL.exists() else df_diario.iloc[0:0]
+    df_mensual = leer_csv_historico(PRECIOS_MENSUAL) if PRECIOS_MENSUAL.exists() else df_diario.iloc[0:0]
+
+    vencidos = df_diario["fecha"] < corte_diario
+    if vencidos.any():
+        df_semanal = _snapshots(pd.concat([df_semanal, df_diario[vencidos]], ignore_index=True), "%G-%V")
+        df_diario  = df_diario[~vencidos]
+        df_diario.to_csv(PRECIOS_COMPACTO, index=False, encoding="utf-8-sig")
+
+        vencidos_s = df_semanal["fecha"] < corte_semanal
+        if vencidos_s.any():
+            df_mensual = _snapshots(pd.concat([df_mensual, df_semanal[vencidos_s]], ignore_index=True), "%Y-%m")
+            df_semanal = df_semanal[~vencidos_s]
+            df_mensual.to_csv(PRECIOS_MENSUAL, index=False, encoding="utf-8-sig")
+        df_semanal.to_csv(PRECIOS_SEMANAL, index=False, encoding="utf-8-sig")
+        print(f"  Histórico compactado: {df_diario['fecha'].nunique()} días diarios · "
+              f"{df_semanal['fecha'].nunique()} semanales · {df_mensual['fecha'].nunique()} mensuales")
+
+    return pd.concat([df_mensual, df_semanal, df_diario], ignore_index=True)
+
+
+def actualizar_historico(df_hoy, ruta=PRECIOS_COMPACTO, ruta_db=None):
+    """
+    Agrega df_hoy al histórico diario. Si existe el índice SQLite (por
+    defecto junto al CSV; se crea con `consultar_precios.py reconstruir`)
+    también lo sincroniza. Si no existe no se crea: rearmarlo desde todo
+    el histórico en cada corrida de Actions costaría minutos y se tiraría.
+    """
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    if ruta.exists():
+        df_hist = leer_csv_historico(ruta)
         fecha_hoy = df_hoy["fecha"].iloc[0]
         df_hist = df_hist[df_hist["fecha"] != fecha_hoy]
         df_total = pd.concat([df_hist, df_hoy], ignore_index=True)
     else:
         df_total = df_hoy
-    df_total.to_csv(PRECIOS_COMPACTO, index=False, encoding="utf-8-sig")
+    df_total.to_csv(ruta, index=False, encoding="utf-8-sig")
     print(f"  Histórico actualizado: {len(df_total)} filas totales")
+    ruta_db = Path(ruta_db or ruta.parent / historico_db.NOMBRE_DB)
+    if ruta_db.exists():
+        historico_db.sincronizar(df_hoy, df_total, ruta_db)
     return df_total
 
 
-def calcular_variacion_periodo(df, dias):
+# ──────────────────────────────────────────────
+# Precio unitario (por kg / litro / unidad)
+# ──────────────────────────────────────────────
+# "Syrup Hersheys Chocolate Botella 680gr", "Gaseosa 6 x 1.5 L", "Tapas 12 Un"
+PATRON_TAMANO = (
+    r"(?:(?P<mult>\d+)\s*[xX]\s*)?"
+    r"(?P<cant>\d+(?:[.,]\d+)?)\s*"
+    r"(?P<unidad>kgs?|kilos?|grs?|gramos|g|mg|ml|cc|cm3|cl|lts?|litros?|l|un|u|unidades)\b"
+)
+# "Gaseosa 2.25 L Pack 6 U": el pack multiplica el peso / volumen
+PATRON_PACK = r"\bpack\s*(?:[xX]\s*)?(?P<pack>\d+)"
+# "Papa Fraccionada Por Kg", "Ensalada Rusa X Kg": el precio ya es por kg / litro
+PATRON_POR_UNIDAD = r"\b(?:por|x)\s+(?P<unidad>kgs?|kilos?|litros?)\b"
+# Cambiar al tocar el parseo: invalida los tamaños del cache
+VERSION_TAMANO = 2
+
+# unidad leída → (unidad normalizada, factor a esa unidad)
+UNIDADES = {
+    "kg": ("kg", 1), "kgs": ("kg", 1), "kilo": ("kg", 1), "kilos": ("kg", 1),
+    "g": ("kg", 1e-3), "gr": ("kg", 1e-3), "grs": ("kg", 1e-3), "gramos": ("kg", 1e-3),
+    "mg": ("kg", 1e-6),
+    "l": ("l", 1), "lt": ("l", 1), "lts": ("l", 1), "litro": ("l", 1), "litros": ("l", 1),
+    "ml": ("l", 1e-3), "cc": ("l", 1e-3), "cm3": ("l", 1e-3), "cl": ("l", 1e-2),
+    "un": ("un", 1), "u": ("un", 1), "unidades": ("un", 1),
+}
+
+
+def extraer_tamano(nombres):
+    """
+    Cantidad normalizada y unidad (kg / l / un) de cada nombre, vectorizado.
+    Si el nombre trae varios tamaños ("4 U - 320 Grs") gana el primer peso o
+    volumen; las unidades sólo cuentan si no hay ninguno.
+    """
+    nombres = nombres.astype(str)
+    m = nombres.str.extractall(PATRON_TAMANO, flags=re.IGNORECASE)
+    unidad = m["unidad"].str.lower()
+    norm   = unidad.map(lambda u: UNIDADES.get(u, (None, None)))
+    factor = pd.to_numeric(norm.str[1], errors="coerce")
+    cant   = pd.to_numeric(m["cant"].str.replace(",", ".", regex=False), errors="coerce")
+    mult   = pd.to_numeric(m["mult"], errors="coerce")
+    m = pd.DataFrame({
+        "cantidad":  cant * mult.fillna(1) * factor,
+        "unidad":    norm.str[0],
+        "con_mult":  mult.notna(),
+        "prioridad": (norm.str[0] == "un").astype(int),
+    })
+    m = m[m["cantidad"] > 0].reset_index(level="match")
+    m = m.sort_values(["prioridad", "match"], kind="stable")
+    m = m[~m.index.duplicated()].reindex(nombres.index)
+
+    # Pack de N envases, salvo que el tamaño ya venga como "N x ..."
+    pack = pd.to_numeric(nombres.str.extract(PATRON_PACK, flags=re.IGNORECASE)["pack"], errors="coerce")
+    usa_pack = pack.notna() & (m["unidad"] != "un") & ~m["con_mult"].fillna(False).astype(bool)
+    m.loc[usa_pack, "cantidad"] *= pack[usa_pack]
+
+    # Sin peso ni volumen en el nombre pero vendido "por kg": cantidad 1
+    por = nombres.str.extract(PATRON_POR_UNIDAD, flags=re.IGNORECASE)["unidad"].str.lower()
+    usa_por = por.notna() & (m["cantidad"].isna() | (m["unidad"] == "un"))
+    m.loc[usa_por, "cantidad"] = 1.0
+    m.loc[usa_por, "unidad"]   = por[usa_por].map(lambda u: UNIDADES[u][0])
+
+    return pd.DataFrame({"cantidad": m["cantidad"], "unidad": m["unidad"]}, index=nombres.index)
+
+
+def cargar_cache_unidades(ruta=CACHE_UNIDADES):
+    """Cache de tamaños; las filas parseadas con otra VERSION_TAMANO se descartan y se reparsean."""
+    if Path(ruta).exists():
+        cache = pd.read_csv(ruta, encoding="utf-8-sig", dtype={"sku_id": str, "nombre": str})
+        if "version" in cache.columns:
+            return cache[cache["version"] == VERSION_TAMANO].reset_index(drop=True)
+    return pd.DataFrame(columns=["sku_id", "nombre", "cantidad", "unidad", "version"])
+
+
+def agregar_precio_unitario(df, ruta_cache=CACHE_UNIDADES):
+    """
+    Agrega cantidad, unidad y precio_unitario a df. El tamaño se parsea una
+    sola vez por (sku_id, nombre): el cache persiste en data/ y cada día sólo
+    se parsean los SKUs nuevos o renombrados.
+    """
+    cache, nuevos = completar_cache_unidades(cargar_cache_unidades(ruta_cache), df)
+    if nuevos:
+        guardar_cache_unidades(cache, ruta_cache)
+    return unir_precio_unitario(df, cache)
+
+
+def completar_cache_unidades(cache, df, verbose=True):
+    """Parsea los (sku_id, nombre) de df que faltan en el cache. Devuelve (cache, n_nuevos)."""
+    pares = df[["sku_id", "nombre"]].drop_duplicates()
+    nuevos = pares.merge(cache[["sku_id", "nombre"]], on=["sku_id", "nombre"],
+                         how="left", indicator=True)
+    nuevos = nuevos[nuevos["_merge"] == "left_only"].drop(columns="_merge")
+    if nuevos.empty:
+        return cache, 0
+    nuevos = pd.concat([nuevos.reset_index(drop=True),
+                        extraer_tamano(nuevos["nombre"].reset_index(drop=True))], axis=1)
+    nuevos["version"] = VERSION_TAMANO
+    if verbose:
+        print(f"  Tamaños parseados: {len(nuevos)} nombres nuevos "
+              f"({int(nuevos['cantidad'].notna().sum())} con tamaño)")
+    return pd.concat([cache, nuevos], ignore_index=True), len(nuevos)
+
+
+def guardar_cache_unidades(cache, ruta=CACHE_UNIDADES):
+    Path(ruta).parent.mkdir(parents=True, exist_ok=True)
+    cache.to_csv(ruta, index=False, encoding="utf-8-sig")
+
+
+def unir_precio_unitario(df, cache):
+    df = df.merge(cache[["sku_id", "nombre", "cantidad", "unidad"]], on=["sku_id", "nombre"], how="left")
+    df["precio_unitario"] = df["precio_actual"] / df["cantidad"]
+    return df
+
+
+def contar_cambios_tamano(df):
+    """SKUs cuya cantidad cambió entre las dos últimas fechas (posible reduflación)."""
+    fechas = sorted(df["fecha"].unique())
+    if len(fechas) < 2:
+        return 0, 0
+    hoy = df[df["fecha"] == fechas[-1]][["sku_id", "cantidad"]]
+    ant = df[df["fecha"] == fechas[-2]][["sku_id", "cantidad"]]
+    m = hoy.merge(ant, on="sku_id", suffixes=("_hoy", "_ant")).dropna()
+    return int((m["cantidad_hoy"] < m["cantidad_ant"]).sum()), int((m["cantidad_hoy"] > m["cantidad_ant"]).sum())
+
+
+def calcular_variacion_periodo(df, dias, columna="precio_actual"):
     fechas = sorted(df["fecha"].unique())
     if len(fechas) < 2:
         return None
@@ -104,8 +403,8 @@ def calcular_variacion_periodo(df, dias):
         return None
     fecha_ref_real = fechas_disp[-1]
 
-    df_hoy = df[df["fecha"] == fecha_hoy][["sku_id", "precio_actual"]].rename(columns={"precio_actual": "p_hoy"})
-    df_ref  = df[df["fecha"] == fecha_ref_real][["sku_id", "precio_actual"]].rename(columns={"precio_actual": "p_ref"})
+    df_hoy = df[df["fecha"] == fecha_hoy][["sku_id", columna]].rename(columns={columna: "p_hoy"})
+    df_ref  = df[df["fecha"] == fecha_ref_real][["sku_id", columna]].rename(columns={columna: "p_ref"})
 
     merged = df_hoy.merge(df_ref, on="sku_id")
     merged = merged[(merged["p_hoy"] > 0) & (merged["p_ref"] > 0)]
@@ -115,45 +414,50 @@ def calcular_variacion_periodo(df, dias):
     return round(merged["diff_pct"].mean(), 2)
 
 
-def calcular_graficos(df, dias_max):
-    fechas = sorted(df["fecha"].unique())
-    if len(fechas) < 2:
-        return {"total": [], "categorias": {}}
-
+def rango_fechas(fechas, dias_max):
+    """Sufijo de `fechas` (ordenadas) que cubre los últimos `dias_max` días."""
     fecha_inicio = (datetime.strptime(fechas[-1], "%Y-%m-%d") - timedelta(days=dias_max)).strftime("%Y-%m-%d")
     fechas_rango = [f for f in fechas if f >= fecha_inicio]
     if len(fechas_rango) < 2:
         fechas_rango = fechas[-min(len(fechas), dias_max):]
+    return fechas_rango
 
-    fecha_base = fechas_rango[0]
-    serie_total = [{"fecha": fecha_base, "pct": 0.0}]
+
+def calcular_graficos(df, dias_max):
+    fechas = sorted(df["fecha"].unique())
+    if len(fechas) < 2:
+        return {"total": [], "categorias": {}}
+
+    fechas_rango = rango_fechas(fechas, dias_max)
 
     # Solo incluir categorías presentes en los datos
     cats_presentes = [c for c in ORDEN_CATS if c in df["cat_principal"].unique()]
-    series_cats = {cat: [{"fecha": fecha_base, "pct": 0.0}] for cat in cats_presentes}
-    pct_acum_total = 0.0
-    pct_acum_cats  = {cat: 0.0 for cat in cats_presentes}
 
-    for i in range(1, len(fechas_rango)):
-        f_ant = fechas_rango[i - 1]
-        f_act = fechas_rango[i]
+    # Variaciones de todos los pares de días consecutivos en un solo merge
+    merged = variaciones_diarias(df, fechas_rango, ["cat_principal"])
+    return armar_graficos(merged.groupby("fecha")["diff_pct"].mean(),
+                          merged.groupby(["cat_principal", "fecha"])["diff_pct"].mean(),
+                          fechas_rango, cats_presentes)
 
-        df_ant = df[df["fecha"] == f_ant][["sku_id", "precio_actual", "cat_principal"]]
-        df_act = df[df["fecha"] == f_act][["sku_id", "precio_actual", "cat_principal"]]
-        merged = df_ant.merge(df_act, on="sku_id", suffixes=("_ant", "_act"))
-        merged = merged[(merged["precio_actual_ant"] > 0) & (merged["precio_actual_act"] > 0)]
 
-        if not merged.empty:
-            merged["diff_pct"] = (merged["precio_actual_act"] - merged["precio_actual_ant"]) / merged["precio_actual_ant"] * 100
-            pct_acum_total += merged["diff_pct"].mean()
+def armar_graficos(media_total, media_cat, fechas_rango, cats_presentes):
+    """Series acumuladas de graficos.json a partir de la variación media por fecha."""
+    fecha_base = fechas_rango[0]
+    fechas_var = fechas_rango[1:]
+    acum_total = media_total.reindex(fechas_var).fillna(0.0).cumsum()
+    por_cat = media_cat
 
-        serie_total.append({"fecha": f_act, "pct": round(pct_acum_total, 2)})
+    serie_total = [{"fecha": fecha_base, "pct": 0.0}]
+    serie_total += [{"fecha": f, "pct": round(v, 2)} for f, v in zip(fechas_var, acum_total)]
 
-        for cat in cats_presentes:
-            sub = merged[merged["cat_principal_ant"] == cat] if not merged.empty else pd.DataFrame()
-            if not sub.empty:
-                pct_acum_cats[cat] += sub["diff_pct"].mean()
-            series_cats[cat].append({"fecha": f_act, "pct": round(pct_acum_cats[cat], 2)})
+    series_cats = {}
+    for cat in cats_presentes:
+        if cat in por_cat.index.get_level_values(0):
+            acum = por_cat.loc[cat].reindex(fechas_var).fillna(0.0).cumsum()
+        else:
+            acum = pd.Series(0.0, index=fechas_var)
+        series_cats[cat] = [{"fecha": fecha_base, "pct": 0.0}]
+        series_cats[cat] += [{"fecha": f, "pct": round(v, 2)} for f, v in zip(fechas_var, acum)]
 
     return {"total": serie_total, "categorias": series_cats}
 
@@ -169,8 +473,16 @@ def calcular_ranking(df, dias, top_n=20):
         return [], []
     fecha_ref_real = fechas_disp[-1]
 
-    df_hoy = df[df["fecha"] == fecha_hoy][["sku_id", "nombre", "marca", "categoria", "precio_actual"]]
-    df_ref  = df[df["fecha"] == fecha_ref_real][["sku_id", "precio_actual"]].rename(columns={"precio_actual": "precio_ref"})
+    con_unitario = "precio_unitario" in df.columns
+    cols_hoy = ["sku_id", "nombre", "marca", "categoria", "precio_actual"]
+    cols_ref = ["sku_id", "precio_actual"]
+    if con_unitario:
+        cols_hoy += ["precio_unitario", "unidad"]
+        cols_ref += ["precio_unitario"]
+
+    df_hoy = df[df["fecha"] == fecha_hoy][cols_hoy]
+    df_ref  = df[df["fecha"] == fecha_ref_real][cols_ref].rename(
+        columns={"precio_actual": "precio_ref", "precio_unitario": "precio_unitario_ref"})
     merged = df_hoy.merge(df_ref, on="sku_id")
     merged = merged[(merged["precio_actual"] > 0) & (merged["precio_ref"] > 0)]
     if merged.empty:
@@ -179,12 +491,114 @@ def calcular_ranking(df, dias, top_n=20):
     merged["diff_pct"] = (merged["precio_actual"] - merged["precio_ref"]) / merged["precio_ref"] * 100
     merged = merged.rename(columns={"precio_actual": "precio_hoy"})
 
-    sube = merged.nlargest(top_n, "diff_pct")[["sku_id", "nombre", "marca", "categoria", "precio_hoy", "precio_ref", "diff_pct"]]
-    baja = merged.nsmallest(top_n, "diff_pct")[["sku_id", "nombre", "marca", "categoria", "precio_hoy", "precio_ref", "diff_pct"]]
-    return sube.to_dict("records"), baja.to_dict("records")
-
-
-def calcular_resumen(df):
+    cols = ["sku_id", "nombre", "marca", "categoria", "precio_hoy", "precio_ref", "diff_pct"]
+    if con_unitario:
+        # Variación por kg / litro / unidad: difiere de diff_pct cuando cambió
+        # el tamaño del envase (reduflación)
+        merged["diff_unit_pct"] = ((merged["precio_unitario"] - merged["precio_unitario_ref"])
+                                   / merged["precio_unitario_ref"] * 100)
+        merged = merged.rename(columns={"precio_unitario": "precio_unitario_hoy"})
+        cols += ["precio_unitario_hoy", "unidad", "diff_unit_pct"]
+
+    sube = merged.nlargest(top_n, "diff_pct")[cols]
+    baja = merged.nsmallest(top_n, "diff_pct")[cols]
+    return _registros(sube), _registros(baja)
+
+
+def _registros(df):
+    # NaN no es JSON válido: los campos sin dato van como null
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def variaciones_diarias(df, fechas_rango, columnas=()):
+    """
+    Variación % de cada SKU entre fechas consecutivas de `fechas_rango`, en un
+    solo merge sobre todo el rango (no un merge por par de fechas). Las
+    columnas extra se toman del día anterior, igual que calcular_graficos.
+    """
+    pos = {f: i for i, f in enumerate(fechas_rango)}
+    cols = ["sku_id", "fecha", "precio_actual", *columnas]
+    sub = df.loc[df["fecha"].isin(pos), cols].copy()
+    sub["i"] = sub["fecha"].map(pos)
+
+    ant = sub.drop(columns="fecha").rename(columns={"precio_actual": "p_ant"})
+    ant["i"] += 1
+    act = sub[["sku_id", "fecha", "precio_actual", "i"]].rename(columns={"precio_actual": "p_act"})
+    merged = act.merge(ant, on=["sku_id", "i"])
+    merged = merged[(merged["p_ant"] > 0) & (merged["p_act"] > 0)]
+    merged["diff_pct"] = (merged["p_act"] - merged["p_ant"]) / merged["p_ant"] * 100
+    return merged
+
+
+def calcular_rollup(df, dias_max=ROLLUP_DIAS):
+    """
+    Cubo de variaciones para todos los niveles de NIVELES_ROLLUP en una sola
+    pasada: las variaciones por SKU se calculan una vez y cada nivel es sólo
+    un groupby. Devuelve {nivel: {"fechas": [...], "grupos": {clave: series}}}
+    con series columnares alineadas a "fechas" (índice acumulado, variación
+    del día, suben, bajan, total).
+    """
+    fechas = sorted(df["fecha"].unique())
+    if len(fechas) < 2:
+        return {nivel: {"fechas": fechas, "grupos": {}} for nivel in NIVELES_ROLLUP}
+
+    fechas_rango = rango_fechas(fechas, dias_max)
+    merged = variaciones_diarias(df, fechas_rango, COLUMNAS_ROLLUP)
+    aggs, skus_marca = agregar_rollup(merged)
+    return armar_rollup(aggs, skus_marca, fechas_rango)
+
+
+def agregar_rollup(merged):
+    """
+    Agregados por (grupo, fecha) de cada nivel sobre las variaciones por SKU
+    de variaciones_diarias, más los pares (marca, sku_id) para el filtro de
+    MIN_SKUS_MARCA. Agregados de rangos de fechas disjuntos se pueden concatenar.
+    """
+    merged = merged.copy()
+    for c in COLUMNAS_ROLLUP:
+        merged[c] = merged[c].fillna("Otros").astype(str)
+    merged["sube"] = merged["diff_pct"] > 0
+    merged["baja"] = merged["diff_pct"] < 0
+
+    aggs = {}
+    for nivel, cols in NIVELES_ROLLUP.items():
+        clave = merged[cols[0]]
+        for c in cols[1:]:
+            clave = clave + SEP_NIVEL + merged[c]
+        aggs[nivel] = merged.assign(grupo=clave).groupby(["grupo", "fecha"]).agg(
+            var=("diff_pct", "mean"),
+            sube=("sube", "sum"),
+            baja=("baja", "sum"),
+            n=("diff_pct", "size"),
+        )
+    skus_marca = merged[["marca", "sku_id"]].drop_duplicates()
+    return aggs, skus_marca
+
+
+def armar_rollup(aggs, skus_marca, fechas_rango):
+    fechas_var = fechas_rango[1:]
+    cubo = {}
+    for nivel, agg in aggs.items():
+        if nivel == "marca":
+            skus = skus_marca.groupby("marca")["sku_id"].nunique()
+            agg = agg[agg.index.get_level_values("grupo").isin(skus[skus >= MIN_SKUS_MARCA].index)]
+
+        grupos = {}
+        for grupo, g in agg.groupby(level="grupo", sort=True):
+            g = g.droplevel("grupo").reindex(fechas_var)
+            var = g["var"].fillna(0.0)
+            grupos[grupo] = {
+                "pct":  [0.0] + [round(v, 2) for v in var.cumsum()],
+                "var":  [0.0] + [round(v, 2) for v in var],
+                "sube": [0] + g["sube"].fillna(0).astype(int).tolist(),
+                "baja": [0] + g["baja"].fillna(0).astype(int).tolist(),
+                "n":    [0] + g["n"].fillna(0).astype(int).tolist(),
+            }
+        cubo[nivel] = {"fechas": fechas_rango, "grupos": grupos}
+    return cubo
+
+
+def calcular_resumen(df, cats_presentes=None):
     fechas = sorted(df["fecha"].unique())
     if not fechas:
         return {}
@@ -207,7 +621,8 @@ def calcular_resumen(df):
             igual = int((merged["precio_actual"] == merged["p_ant"]).sum())
 
     cats_dia = []
-    cats_presentes = [c for c in ORDEN_CATS if c in df["cat_principal"].unique()]
+    if cats_presentes is None:
+        cats_presentes = [c for c in ORDEN_CATS if c in df["cat_principal"].unique()]
     for cat in cats_presentes:
         df_cat = df[df["cat_principal"] == cat]
         v = calcular_variacion_periodo(df_cat, 1)
@@ -230,7 +645,7 @@ def calcular_resumen(df):
             "total_productos":         n_total,
         })
 
-    return {
+    resumen = {
         "fecha_actualizacion":     fecha_hoy,
         "total_productos":         int(len(df_hoy)),
         "variacion_dia":           var_dia,
@@ -242,59 +657,281 @@ def calcular_resumen(df):
         "categorias_dia":          cats_dia,
     }
 
+    if "precio_unitario" in df.columns:
+        reduccion, aumento = contar_cambios_tamano(df)
+        resumen["variacion_unitaria_dia"]  = calcular_variacion_periodo(df, 1, "precio_unitario")
+        resumen["variacion_unitaria_mes"]  = calcular_variacion_periodo(df, 30, "precio_unitario")
+        resumen["variacion_unitaria_anio"] = calcular_variacion_periodo(df, 365, "precio_unitario")
+        resumen["productos_reducen_tamano_dia"]  = reduccion
+        resumen["productos_aumentan_tamano_dia"] = aumento
+    return resumen
 
-def guardar_json(datos, nombre):
-    DIR_DATA.mkdir(exist_ok=True)
-    ruta = DIR_DATA / nombre
+
+def guardar_json(datos, nombre, compacto=False, directorio=DIR_DATA, verbose=True):
+    directorio = Path(directorio)
+    directorio.mkdir(parents=True, exist_ok=True)
+    ruta = directorio / nombre
     with open(ruta, "w", encoding="utf-8") as f:
-        json.dump(datos, f, ensure_ascii=False, indent=2)
-    print(f"  JSON guardado: {ruta}")
+        if compacto:
+            json.dump(datos, f, ensure_ascii=False, separators=(",", ":"))
+        else:
+            json.dump(datos, f, ensure_ascii=False, indent=2)
+    if verbose:
+        print(f"  JSON guardado: {ruta}")
+
+
+def calcular_salidas(df_hist, perfil=None, verbose=True, rollup=False):
+    """
+    Calcula todas las salidas de data/ a partir del histórico. La "fecha de
+    hoy" es siempre la última fecha de df_hist, así que pasarle el histórico
+    recortado (historico_hasta) da las salidas tal como eran en esa fecha.
+    Los rollups por nivel sólo se calculan con rollup=True: ni la web ni el
+    tweet los leen y cuestan tanto como todos los gráficos juntos.
+    Devuelve {nombre_archivo: datos}.
+    """
+    perfil = perfil or Perfilador()
+    log    = print if verbose else (lambda *a, **k: None)
+
+    log("\n4. Calculando resumen...")
+    with perfil.etapa("resumen", filas=len(df_hist)):
+        resumen = calcular_resumen(df_hist)
+
+    log("\n5. Calculando gráficos...")
+    with perfil.etapa("graficos"):
+        graficos = {}
+        for key, dias in PERIODOS.items():
+            with perfil.etapa(f"graficos_{key}", dias=dias):
+                graficos[key] = calcular_graficos(df_hist, dias)
+
+    log("\n6. Calculando rankings...")
+    with perfil.etapa("rankings"):
+        rankings = {}
+        for key, dias in RANKINGS.items():
+            with perfil.etapa(f"ranking_{key}", dias=dias):
+                rankings[key] = calcular_ranking(df_hist, dias)
+
+    cubo = {}
+    if rollup:
+        log("\n7. Calculando rollups por nivel...")
+        with perfil.etapa("rollup"):
+            cubo = calcular_rollup(df_hist)
+
+    return empaquetar_salidas(resumen, graficos, rankings, cubo)
+
+
+def empaquetar_salidas(resumen, graficos, rankings, cubo):
+    """{nombre_archivo: datos}; rankings es {clave de RANKINGS: (sube, baja)}."""
+    # ranking_baja_dia también en resumen para el tweet
+    resumen["ranking_baja_dia"] = rankings["dia"][1][:10]
+
+    salidas = {}
+    salidas["resumen.json"]          = resumen
+    salidas["graficos.json"]         = graficos
+    salidas["ranking_dia.json"]      = rankings["dia"][0]
+    salidas["ranking_baja_dia.json"] = rankings["dia"][1]
+    salidas["ranking_mes.json"]      = rankings["mes"][0]
+    salidas["ranking_anio.json"]     = rankings["anio"][0]
+    for nivel, datos in cubo.items():
+        salidas[f"rollup_{nivel}.json"] = datos
+    return salidas
+
+
+def guardar_salidas(salidas, directorio=DIR_DATA, verbose=True, dir_rollup=DIR_ROLLUP):
+    # Copias viejas de cuando los rollups se escribían siempre junto al resto
+    for nivel in NIVELES_ROLLUP:
+        (Path(directorio) / f"rollup_{nivel}.json").unlink(missing_ok=True)
+    for nombre, datos in salidas.items():
+        if nombre.startswith("rollup_"):
+            guardar_json(datos, nombre, compacto=True, directorio=dir_rollup, verbose=verbose)
+        else:
+            guardar_json(datos, nombre, directorio=directorio, verbose=verbose)
+
+
+# ──────────────────────────────────────────────
+# As-of / backfill
+# ──────────────────────────────────────────────
+def historico_hasta(df, fecha):
+    """Histórico tal como estaba al cierre de `fecha` (YYYY-MM-DD)."""
+    return df[df["fecha"] <= fecha]
+
+
+def primera_fecha_asof():
+    """
+    Primera fecha que as-of / backfill pueden reconstruir, o None si no hay
+    límite. Las fechas que ya pasaron a los tiers semanal / mensual no
+    tienen el día anterior (la "variación del día" sería semanal o mensual),
+    así que hace falta que la fecha y la anterior estén en el tier diario.
+    """
+    if not (PRECIOS_SEMANAL.exists() or PRECIOS_MENSUAL.exists()) or not PRECIOS_COMPACTO.exists():
+        return None
+    fechas = sorted(pd.read_csv(PRECIOS_COMPACTO, encoding="utf-8-sig", usecols=["fecha"])["fecha"].unique())
+    return fechas[min(1, len(fechas) - 1)] if fechas else None
 
 
-def main():
-    print(f"\n{'='*60}")
-    print(f" ANALIZAR PRECIOS JUMBO")
-    print(f" {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"{'='*60}\n")
+_HIST_COMPARTIDO = None    # histórico heredado por los workers del backfill
 
-    DIR_DATA.mkdir(exist_ok=True)
-    fecha_hoy = datetime.now().strftime("%Y-%m-%d")
 
-    print("1. Cargando CSVs del día...")
-    df_raw = cargar_csvs_hoy()
-    if df_raw is None:
-        sys.exit(1)
+def _init_worker_backfill(df_hist=None):
+    # Con fork el histórico ya está en memoria (copy-on-write) y no se pasa;
+    # con spawn llega una sola vez por worker vía initargs.
+    global _HIST_COMPARTIDO
+    if df_hist is not None:
+        _HIST_COMPARTIDO = df_hist
 
-    print(f"\n2. Preparando datos ({len(df_raw)} filas)...")
-    df_hoy = preparar_df_dia(df_raw, fecha_hoy)
-    print(f"   {len(df_hoy)} productos válidos")
-    print(f"   Categorías encontradas: {sorted(df_hoy['cat_principal'].unique())}")
 
-    print("\n3. Actualizando histórico...")
-    df_hist = actualizar_historico(df_hoy)
+def _backfill_fecha(fecha, dir_salida, rollup=False):
+    df = historico_hasta(_HIST_COMPARTIDO, fecha)
+    salidas = calcular_salidas(df, verbose=False, rollup=rollup)
+    guardar_salidas(salidas, Path(dir_salida) / fecha, verbose=False,
+                    dir_rollup=Path(dir_salida) / fecha)
+    return fecha, salidas["resumen.json"].get("variacion_dia")
 
-    print("\n4. Calculando resumen...")
-    resumen = calcular_resumen(df_hist)
-    guardar_json(resumen, "resumen.json")
 
-    print("\n5. Calculando gráficos...")
-    graficos = {}
-    for key, dias in PERIODOS.items():
-        graficos[key] = calcular_graficos(df_hist, dias)
-    guardar_json(graficos, "graficos.json")
+def backfill(df_hist, desde, hasta, workers=None, dir_salida=DIR_ASOF, rollup=False):
+    """
+    Reconstruye las salidas para cada fecha del histórico en [desde, hasta],
+    una carpeta dir_salida/<fecha>/ por día, en procesos paralelos que
+    comparten el histórico ya cargado.
+    """
+    global _HIST_COMPARTIDO
+    fechas = [f for f in sorted(df_hist["fecha"].unique()) if desde <= f <= hasta]
+    if not fechas:
+        print(f"  No hay fechas en el histórico entre {desde} y {hasta}")
+        return []
+
+    workers = min(workers or os.cpu_count() or 1, len(fechas))
+    metodos = multiprocessing.get_all_start_methods()
+    if "fork" in metodos:
+        _HIST_COMPARTIDO = df_hist
+        ctx, initargs = multiprocessing.get_context("fork"), ()
+    else:
+        ctx, initargs = multiprocessing.get_context(), (df_hist,)
+
+    print(f"  Backfill de {len(fechas)} fechas ({fechas[0]} → {fechas[-1]}) con {workers} workers")
+    hechas = []
+    t_inicio = time.time()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                             initializer=_init_worker_backfill, initargs=initargs) as pool:
+        futuros = [pool.submit(_backfill_fecha, f, str(dir_salida), rollup) for f in fechas]
+        for n, fut in enumerate(as_completed(futuros), 1):
+            fecha, v = fut.result()
+            hechas.append(fecha)
+            v_str = "—" if v is None else f"{'+'if v>0 else ''}{v:.2f}%"
+            print(f"  [{n:03d}/{len(fechas)}] {fecha}  var. día: {v_str}"
+                  f"  ({time.time() - t_inicio:.0f}s)")
+    _HIST_COMPARTIDO = None
+    return sorted(hechas)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Analiza precios de Jumbo y genera los JSONs de data/")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"registra tiempo y memoria por etapa en {DIR_PERFIL}/perfil_*.json")
+    parser.add_argument("--cprofile", action="store_true",
+                        help="con --profile, vuelca además un .prof de cProfile por etapa")
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="con --profile, mide además el pico Python por etapa (mucho más lento)")
+    modo = parser.add_mutually_exclusive_group()
+    modo.add_argument("--as-of", metavar="FECHA",
+                      help=f"recalcula las salidas tal como eran en FECHA (YYYY-MM-DD) en {DIR_ASOF}/FECHA/")
+    modo.add_argument("--backfill", nargs=2, metavar=("DESDE", "HASTA"),
+                      help=f"como --as-of para cada fecha del rango, en paralelo, en {DIR_ASOF}/")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="procesos para --backfill (default: CPUs disponibles)")
+    parser.add_argument("--rollup", action="store_true",
+                        help=f"calcula además los rollups por nivel (en {DIR_ROLLUP}/, o junto a "
+                             "las salidas de --as-of / --backfill)")
+    parser.add_argument("--memoria-max", type=int, default=None, metavar="MB",
+                        help="recorre el histórico por bloques sin superar MB de estado retenido "
+                             "(ver analisis_por_bloques.py)")
+    args = parser.parse_args(argv)
+    if args.memoria_max and (args.as_of or args.backfill):
+        parser.error("--memoria-max no se combina con --as-of / --backfill")
+    return args
+
+
+def main_asof(args, perfil):
+    print("1. Cargando histórico...")
+    with perfil.etapa("cargar_historico"):
+        df_hist = cargar_historico()
+        if df_hist.empty:
+            print(f"ERROR: No existe {PRECIOS_COMPACTO}.")
+            sys.exit(1)
+    print(f"   {len(df_hist)} filas, {df_hist['fecha'].nunique()} fechas")
+    minima = primera_fecha_asof()
+    if args.as_of and minima and args.as_of < minima:
+        print(f"ERROR: {args.as_of} ya está compactada en los tiers semanal/mensual; "
+              f"la primera fecha con resolución diaria es {minima}.")
+        sys.exit(1)
+    with perfil.etapa("precio_unitario"):
+        df_hist = agregar_precio_unitario(df_hist)
+
+    if args.backfill:
+        desde, hasta = args.backfill
+        if minima and desde < minima:
+            print(f"   Las fechas anteriores a {minima} están compactadas: el backfill arranca ahí")
+            desde = minima
+        print(f"\n2. Backfill {desde} → {hasta}...")
+        with perfil.etapa("backfill", desde=desde, hasta=hasta):
+            backfill(df_hist, desde, hasta, workers=args.workers, rollup=args.rollup)
+        return
+
+    print(f"\n2. Salidas al {args.as_of}...")
+    df_asof = historico_hasta(df_hist, args.as_of)
+    if df_asof.empty:
+        print(f"ERROR: No hay datos hasta {args.as_of}.")
+        sys.exit(1)
+    salidas = calcular_salidas(df_asof, perfil, rollup=args.rollup)
+    guardar_salidas(salidas, DIR_ASOF / args.as_of, dir_rollup=DIR_ASOF / args.as_of)
+
+
+def ejecutar_analisis(df_raw, perfil=None, fecha_hoy=None, memoria_max=None, rollup=False):
+    """
+    Pasos 2–8 del análisis sobre las filas crudas del día (ya sea leídas de
+    output_jumbo/ o recibidas en memoria desde el scraper). Escribe los JSON
+    de data/ y devuelve (salidas, df_hist) para que el generador web no
+    relea los JSON ni el histórico. Con memoria_max (MB) el histórico se
+    recorre por bloques y df_hist es None. Con rollup también calcula los
+    rollups por nivel (en DIR_ROLLUP).
+    """
+    perfil    = perfil or Perfilador()
+    fecha_hoy = fecha_hoy or datetime.now().strftime("%Y-%m-%d")
 
-    print("\n6. Calculando rankings...")
-    rank_sube_dia,  rank_baja_dia  = calcular_ranking(df_hist, 1)
-    rank_sube_mes,  rank_baja_mes  = calcular_ranking(df_hist, 30)
-    rank_sube_anio, rank_baja_anio = calcular_ranking(df_hist, 365)
-    guardar_json(rank_sube_dia,  "ranking_dia.json")
-    guardar_json(rank_baja_dia,  "ranking_baja_dia.json")
-    guardar_json(rank_sube_mes,  "ranking_mes.json")
-    guardar_json(rank_sube_anio, "ranking_anio.json")
+    print(f"\n2. Preparando datos ({len(df_raw)} filas)...")
+    with perfil.etapa("preparar_df_dia", filas=len(df_raw)):
+        df_raw, df_otras = separar_tiendas(df_raw)
+        df_hoy = preparar_df_dia(df_raw, fecha_hoy)
+        df_otras = {t: preparar_df_dia(d, fecha_hoy) for t, d in df_otras.items()}
+    print(f"   {len(df_hoy)} productos válidos")
+    print(f"   Categorías encontradas: {sorted(df_hoy['cat_principal'].unique())}")
+    if df_otras:
+        print(f"   Otras tiendas: " + ", ".join(f"{t} ({len(d)})" for t, d in df_otras.items()))
+
+    if memoria_max:
+        # Import diferido: analisis_por_bloques importa este módulo
+        import analisis_por_bloques
+        df_hist = None
+        salidas = analisis_por_bloques.ejecutar(df_hoy, memoria_max, perfil, rollup=rollup)
+    else:
+        print("\n3. Actualizando histórico...")
+        with perfil.etapa("actualizar_historico"):
+            df_diario = actualizar_historico(df_hoy)
+        with perfil.etapa("compactar_historico"):
+            df_hist = compactar_historico(df_diario, fecha_hoy)
+        with perfil.etapa("precio_unitario"):
+            df_hist = agregar_precio_unitario(df_hist)
+        salidas = calcular_salidas(df_hist, perfil, rollup=rollup)
+
+    if df_otras:
+        with perfil.etapa("comparacion_tiendas"):
+            salidas["comparacion_tiendas.json"] = calcular_comparacion_tiendas(df_hoy, df_otras)
+    else:
+        # Sin otras tiendas hoy, la comparación de una corrida anterior ya no vale
+        (DIR_DATA / "comparacion_tiendas.json").unlink(missing_ok=True)
 
-    # ranking_baja_dia también en resumen para el tweet
-    resumen["ranking_baja_dia"] = rank_baja_dia[:10]
-    guardar_json(resumen, "resumen.json")
+    print("\n8. Guardando JSONs...")
+    guardar_salidas(salidas)
+    resumen = salidas["resumen.json"]
 
     print(f"\n{'='*60}")
     print(f" ANÁLISIS COMPLETADO")
@@ -303,6 +940,44 @@ def main():
         print(f" Variación del día: {'+'if v>0 else ''}{v:.2f}%")
     print(f" Productos relevados: {resumen.get('total_productos', 0)}")
     print(f"{'='*60}")
+    return salidas, df_hist
+
+
+def main(argv=None):
+    args   = parse_args(argv)
+    perfil = Perfilador(activo=args.profile, cprofile=args.cprofile, dir_salida=DIR_PERFIL,
+                        tracemalloc=args.tracemalloc)
+
+    print(f"\n{'='*60}")
+    print(f" ANALIZAR PRECIOS JUMBO")
+    print(f" {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"{'='*60}\n")
+
+    DIR_DATA.mkdir(exist_ok=True)
+
+    if args.as_of or args.backfill:
+        main_asof(args, perfil)
+        if perfil.activo:
+            perfil.imprimir()
+            perfil.guardar()
+        return
+
+    print("1. Cargando CSVs del día...")
+    with perfil.etapa("cargar_csvs"):
+        df_raw = cargar_csvs_hoy()
+    if df_raw is None:
+        sys.exit(1)
+
+    try:
+        ejecutar_analisis(df_raw, perfil, memoria_max=args.memoria_max, rollup=args.rollup)
+    except MemoryError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+
+    if perfil.activo:
+        print("\nPerfil por etapa:")
+        perfil.imprimir()
+        perfil.guardar()
 
 
 if __name__ == "__main__":
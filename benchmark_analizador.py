@@ -0,0 +1,147 @@
+"""
+benchmark_analizador.py
+=======================
+Mide calcular_resumen, calcular_graficos, calcular_ranking y
+actualizar_historico sobre históricos sintéticos a varias escalas
+(tiempo de reloj, CPU y pico de memoria, vía Perfilador).
+
+Además permite guardar una corrida de referencia ("golden") y verificar
+que una versión optimizada del analizador produce las mismas salidas.
+
+Uso:
+    python benchmark_analizador.py                                  # escalas chica y media
+    python benchmark_analizador.py --escalas chica media grande
+    python benchmark_analizador.py --guardar-referencia bench/referencia
+    python benchmark_analizador.py --verificar bench/referencia     # exit 1 si difiere
+"""
+
+import argparse
+import json
+import math
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import analizar_precios_jumbo as apj
+from generar_historico_sintetico import generar_historico
+from perfilador import Perfilador
+
+DIR_BENCH = Path("bench")
+
+# nombre → (SKUs, días)
+ESCALAS = {
+    "chica":  (2000,   30),
+    "media":  (20000,  90),
+    "grande": (60000, 365),
+}
+
+FECHA_FIN  = "2026-01-31"    # fija, para que la referencia sea reproducible
+SEED       = 0
+TOLERANCIA = 1e-6
+
+
+def correr_escala(nombre, perfil):
+    n_skus, dias = ESCALAS[nombre]
+    df_hist = generar_historico(n_skus, dias, fecha_fin=FECHA_FIN, seed=SEED)
+    salidas = {}
+
+    with perfil.etapa(nombre, skus=n_skus, dias=dias, filas=len(df_hist)):
+        with perfil.etapa(f"{nombre}.actualizar_historico"):
+            fecha_hoy = df_hist["fecha"].max()
+            with tempfile.TemporaryDirectory() as tmp:
+                ruta = Path(tmp) / "precios_compacto.csv"
+                df_hist[df_hist["fecha"] != fecha_hoy].to_csv(ruta, index=False, encoding="utf-8-sig")
+                apj.actualizar_historico(df_hist[df_hist["fecha"] == fecha_hoy], ruta=ruta)
+
+        with perfil.etapa(f"{nombre}.calcular_resumen"):
+            salidas["resumen"] = apj.calcular_resumen(df_hist)
+
+        for key, d in apj.PERIODOS.items():
+            with perfil.etapa(f"{nombre}.calcular_graficos_{key}", dias=d):
+                salidas[f"graficos_{key}"] = apj.calcular_graficos(df_hist, d)
+
+        for key, d in apj.RANKINGS.items():
+            with perfil.etapa(f"{nombre}.calcular_ranking_{key}", dias=d):
+                sube, baja = apj.calcular_ranking(df_hist, d)
+                salidas[f"ranking_{key}"] = {"sube": sube, "baja": baja}
+
+    # Normalizamos vía JSON (numpy → tipos nativos), igual que guardar_json
+    return json.loads(json.dumps(salidas, ensure_ascii=False, default=float))
+
+
+def comparar(ref, act, ruta="", difs=None):
+    difs = [] if difs is None else difs
+    if isinstance(ref, dict) and isinstance(act, dict):
+        for k in sorted(set(ref) | set(act)):
+            if k not in ref or k not in act:
+                difs.append(f"{ruta}/{k}: clave presente sólo en {'referencia' if k in ref else 'actual'}")
+            else:
+                comparar(ref[k], act[k], f"{ruta}/{k}", difs)
+    elif isinstance(ref, list) and isinstance(act, list):
+        if len(ref) != len(act):
+            difs.append(f"{ruta}: largo {len(ref)} ≠ {len(act)}")
+        for i, (r, a) in enumerate(zip(ref, act)):
+            comparar(r, a, f"{ruta}[{i}]", difs)
+    elif isinstance(ref, float) or isinstance(act, float):
+        if ref is None or act is None or not math.isclose(ref, act, rel_tol=TOLERANCIA, abs_tol=TOLERANCIA):
+            difs.append(f"{ruta}: {ref} ≠ {act}")
+    elif ref != act:
+        difs.append(f"{ruta}: {ref!r} ≠ {act!r}")
+    return difs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del analizador de precios Jumbo")
+    parser.add_argument("--escalas", nargs="+", choices=list(ESCALAS), default=["chica", "media"])
+    parser.add_argument("--salida", default=str(DIR_BENCH), help="directorio del reporte JSON")
+    parser.add_argument("--cprofile", action="store_true", help="vuelca un .prof por escala")
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="mide además el pico Python por etapa (los tiempos dejan de ser comparables)")
+    grupo = parser.add_mutually_exclusive_group()
+    grupo.add_argument("--guardar-referencia", metavar="DIR", help="guarda las salidas como referencia")
+    grupo.add_argument("--verificar", metavar="DIR", help="compara las salidas contra la referencia")
+    args = parser.parse_args()
+
+    perfil = Perfilador(activo=True, cprofile=args.cprofile, dir_salida=args.salida,
+                        tracemalloc=args.tracemalloc)
+    print(f"\n{'='*60}")
+    print(f" BENCHMARK ANALIZADOR  ·  {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"{'='*60}\n")
+
+    fallas = 0
+    for nombre in args.escalas:
+        n_skus, dias = ESCALAS[nombre]
+        print(f"→ Escala {nombre}: {n_skus} SKUs × {dias} días")
+        salidas = correr_escala(nombre, perfil)
+
+        if args.guardar_referencia:
+            ruta = Path(args.guardar_referencia) / f"referencia_{nombre}.json"
+            ruta.parent.mkdir(parents=True, exist_ok=True)
+            with open(ruta, "w", encoding="utf-8") as f:
+                json.dump(salidas, f, ensure_ascii=False, indent=1)
+            print(f"  Referencia guardada: {ruta}")
+        elif args.verificar:
+            ruta = Path(args.verificar) / f"referencia_{nombre}.json"
+            if not ruta.exists():
+                print(f"  [ERROR] No existe la referencia {ruta}")
+                fallas += 1
+                continue
+            with open(ruta, encoding="utf-8") as f:
+                difs = comparar(json.load(f), salidas)
+            if difs:
+                fallas += 1
+                print(f"  ✗ {len(difs)} diferencias contra {ruta}:")
+                for d in difs[:20]:
+                    print(f"      {d}")
+            else:
+                print(f"  ✓ Salidas idénticas a {ruta}")
+
+    print("\nResultados:")
+    perfil.imprimir()
+    perfil.guardar(args.salida)
+    sys.exit(1 if fallas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+consultar_precios.py
+====================
+Consultas rápidas sobre el histórico usando el índice SQLite
+(data/precios.sqlite, ver historico_db.py). El índice es opcional: se crea
+con `reconstruir` y desde ahí el analizador lo mantiene sincronizado.
+
+Uso:
+    python consultar_precios.py sku 294962 --meses 6
+    python consultar_precios.py categoria "Lácteos" --dias 7 --min-pct 10
+    python consultar_precios.py marca HERSHEYS
+    python consultar_precios.py reconstruir      # rearma el índice desde precios_compacto.csv
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+import historico_db
+from analizar_precios_jumbo import PRECIOS_COMPACTO, cargar_historico
+
+
+def _imprimir(df, t0):
+    ms = (time.perf_counter() - t0) * 1000
+    if df.empty:
+        print(f"Sin resultados ({ms:.1f} ms)")
+        return
+    with pd.option_context("display.max_rows", 500, "display.width", 160,
+                           "display.max_colwidth", 50, "display.float_format", "{:.2f}".format):
+        print(df.to_string(index=False))
+    print(f"\n{len(df)} filas ({ms:.1f} ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consulta el histórico de precios Jumbo")
+    parser.add_argument("--db", default=str(historico_db.RUTA_DB))
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_sku = sub.add_parser("sku", help="historial de precios de un SKU")
+    p_sku.add_argument("sku_id")
+    p_sku.add_argument("--meses", type=int, default=None)
+
+    p_cat = sub.add_parser("categoria", help="variación de los SKUs de una cat_principal")
+    p_cat.add_argument("cat_principal")
+    p_cat.add_argument("--dias", type=int, default=7)
+    p_cat.add_argument("--min-pct", type=float, default=None)
+    p_cat.add_argument("--fecha", default=None, help="YYYY-MM-DD (default: última)")
+
+    p_marca = sub.add_parser("marca", help="productos de una marca en una fecha")
+    p_marca.add_argument("marca")
+    p_marca.add_argument("--fecha", default=None)
+
+    sub.add_parser("reconstruir", help=f"rearma el índice desde {PRECIOS_COMPACTO}")
+    args = parser.parse_args()
+
+    if args.comando == "reconstruir":
+        if not PRECIOS_COMPACTO.exists():
+            print(f"ERROR: No existe {PRECIOS_COMPACTO}.")
+            sys.exit(1)
+        t0 = time.perf_counter()
+        historico_db.reconstruir(cargar_historico(), args.db)
+        print(f"✅ Índice reconstruido: {args.db} ({time.perf_counter() - t0:.1f}s)")
+        return
+
+    # conectar() crea la base: sin este chequeo una consulta dejaría un índice
+    # vacío que el analizador empezaría a sincronizar
+    if not Path(args.db).exists():
+        print(f"No existe el índice {args.db}: crearlo con `consultar_precios.py reconstruir`.")
+        sys.exit(1)
+    con = historico_db.conectar(args.db)
+    if not historico_db.ultima_fecha(con):
+        print(f"El índice {args.db} está vacío: correr el analizador o `consultar_precios.py reconstruir`.")
+        sys.exit(1)
+
+    t0 = time.perf_counter()
+    if args.comando == "sku":
+        desde = None
+        if args.meses:
+            desde = (datetime.now() - timedelta(days=30 * args.meses)).strftime("%Y-%m-%d")
+        _imprimir(historico_db.historial_sku(con, args.sku_id, desde), t0)
+    elif args.comando == "categoria":
+        _imprimir(historico_db.variacion_categoria(con, args.cat_principal, args.dias,
+                                                   args.min_pct, args.fecha), t0)
+    elif args.comando == "marca":
+        _imprimir(historico_db.productos_marca(con, args.marca, args.fecha), t0)
+    con.close()
+
+
+if __name__ == "__main__":
+    main()
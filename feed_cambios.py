@@ -0,0 +1,149 @@
+"""
+feed_cambios.py
+===============
+Feed de cambios de precio generado mientras corre el scraper.
+
+Al arrancar, el scraper carga el precio de cada SKU del último día del
+histórico anterior a hoy (un dict sku_id → (precio, (cat_padre, categoria)))
+y compara cada categoría apenas termina de parsearla. Los cambios se escriben
+como JSON Lines en output_jumbo/cambios_<ts>.jsonl a medida que avanza el scrape,
+así las alertas o el tweet pueden usarlos sin esperar al analizador:
+
+  {"tipo": "sube", "sku_id": "294962", "nombre": "...", "precio_ant": 100.0, "precio": 110.0, "diff_pct": 10.0}
+
+Tipos: nuevo, sube, baja y, al cerrar, eliminado (SKUs de ayer que no
+aparecieron en una categoría que hoy se scrapeó completa). Las categorías
+se identifican por (cat_padre, categoria): los nombres de hoja se repiten en
+distintas ramas del árbol ("Otros", "Congelados", …) y una hoja que falló no
+debe heredar el "completa" de otra con el mismo nombre.
+"""
+
+import json
+import threading
+from collections import Counter
+from pathlib import Path
+
+import pandas as pd
+
+import historico_db
+from analizar_precios_jumbo import PRECIOS_COMPACTO
+
+TOLERANCIA = 0.005     # diferencias de redondeo entre la API y el CSV no son cambios
+FILAS_BLOQUE = 500_000
+COLS_PREVIOS = {"sku_id", "precio_actual", "cat_padre", "categoria", "fecha"}
+
+
+def clave_categoria(cat_padre, categoria):
+    """Clave de una categoría hoja, normalizada igual que en el histórico."""
+    if not isinstance(cat_padre, str) or not cat_padre:
+        cat_padre = "Otros"     # preparar_df_dia guarda así los cat_padre vacíos
+    return cat_padre, categoria
+
+
+def _indexar(filas):
+    # Las categorías se repiten miles de veces: una sola instancia de cada clave
+    cats, previos = {}, {}
+    for sku, precio, cat_padre, categoria in filas:
+        if precio and precio > 0:
+            clave = clave_categoria(cat_padre, categoria)
+            previos[str(sku)] = (float(precio), cats.setdefault(clave, clave))
+    return previos
+
+
+def cargar_precios_previos(fecha_hoy, ruta_db=historico_db.RUTA_DB, ruta_csv=PRECIOS_COMPACTO):
+    """
+    (fecha, {sku_id: (precio, (cat_padre, categoria))}) del último día del histórico
+    anterior a fecha_hoy, o (None, {}) si no hay. Usa el índice SQLite si
+    existe; si no, lee el CSV diario por bloques y sólo retiene esa fecha.
+    """
+    if Path(ruta_db).exists():
+        con = historico_db.conectar(ruta_db)
+        try:
+            fecha = con.execute("SELECT MAX(fecha) FROM fechas WHERE fecha < ?", (fecha_hoy,)).fetchone()[0]
+            if fecha:
+                filas = con.execute("SELECT sku_id, precio_actual, cat_padre, categoria "
+                                    "FROM precios WHERE fecha = ?", (fecha,))
+                return fecha, _indexar(filas)
+        finally:
+            con.close()
+
+    if not Path(ruta_csv).exists():
+        return None, {}
+    fecha, partes = None, []
+    for bloque in pd.read_csv(ruta_csv, encoding="utf-8-sig", dtype={"sku_id": str},
+                              usecols=lambda c: c in COLS_PREVIOS,
+                              chunksize=FILAS_BLOQUE):
+        bloque = bloque[bloque["fecha"] < fecha_hoy]
+        if bloque.empty:
+            continue
+        maxima = bloque["fecha"].max()
+        if fecha is None or maxima > fecha:
+            fecha, partes = maxima, []
+        partes.append(bloque[bloque["fecha"] == fecha])
+    if fecha is None:
+        return None, {}
+    df = pd.concat(partes, ignore_index=True)
+    padres = df["cat_padre"] if "cat_padre" in df.columns else [None] * len(df)
+    return fecha, _indexar(zip(df["sku_id"], df["precio_actual"], padres, df["categoria"]))
+
+
+class FeedCambios:
+    """Compara filas del scrape contra el día anterior y escribe el feed (thread-safe)."""
+
+    def __init__(self, ruta, previos, fecha_ant):
+        self.ruta      = Path(ruta)
+        self.previos   = previos
+        self.fecha_ant = fecha_ant
+        self.vistos    = set()
+        self.cats_ok   = set()
+        self.conteo    = Counter()
+        self.lock      = threading.Lock()
+        self.archivo   = open(self.ruta, "w", encoding="utf-8")
+
+    def _linea(self, tipo, sku, precio_ant, precio, fila=None):
+        reg = {"tipo": tipo, "sku_id": sku}
+        if fila is not None:
+            reg.update({k: fila.get(k) for k in ("nombre", "marca", "cat_principal", "categoria")})
+        reg["precio_ant"] = precio_ant
+        reg["precio"]     = precio
+        reg["diff_pct"]   = (round((precio - precio_ant) / precio_ant * 100, 2)
+                             if precio is not None and precio_ant else None)
+        self.conteo[tipo] += 1
+        return json.dumps(reg, ensure_ascii=False) + "\n"
+
+    def registrar(self, filas, categoria, completa=True):
+        """
+        Filas parseadas de una categoría, identificada por
+        clave_categoria(cat_padre, nombre). Si se scrapeó completa, sus
+        SKUs de ayer que no aparezcan se informan como eliminados al cerrar.
+        """
+        with self.lock:
+            if completa and filas:
+                self.cats_ok.add(categoria)
+            lineas = []
+            for fila in filas:
+                sku = str(fila["sku_id"])
+                if sku in self.vistos:
+                    continue
+                self.vistos.add(sku)
+                precio = float(fila["precio_actual"])
+                ant = self.previos.get(sku)
+                if ant is None:
+                    lineas.append(self._linea("nuevo", sku, None, precio, fila))
+                elif abs(precio - ant[0]) > TOLERANCIA:
+                    lineas.append(self._linea("sube" if precio > ant[0] else "baja", sku, ant[0], precio, fila))
+            if lineas:
+                self.archivo.writelines(lineas)
+                self.archivo.flush()
+
+    def cerrar(self):
+        with self.lock:
+            for sku, (precio_ant, clave) in self.previos.items():
+                if sku not in self.vistos and clave in self.cats_ok:
+                    self.archivo.write(self._linea("eliminado", sku, precio_ant, None,
+                                                   {"categoria": clave[1]}))
+            self.archivo.close()
+        print(f"  Feed de cambios vs {self.fecha_ant}: {self.conteo['sube']} suben · "
+              f"{self.conteo['baja']} bajan · {self.conteo['nuevo']} nuevos · "
+              f"{self.conteo['eliminado']} eliminados → {self.ruta}")
+        return self.conteo
@@ -0,0 +1,157 @@
+"""
+generar_historico_sintetico.py
+==============================
+Genera históricos sintéticos con el mismo formato que
+data/precios_compacto.csv, para medir el analizador a escala
+(p. ej. 60k SKUs × 365 días) sin esperar un año de scraping.
+
+Parámetros:
+  - cantidad de SKUs y de días
+  - mezcla de categorías (por defecto, la proporción real de ORDEN_CATS)
+  - tasa diaria de cambio de precio (real: ~0.9% de los SKUs por día)
+  - churn diario de SKUs (altas/bajas del catálogo)
+
+Uso:
+    python generar_historico_sintetico.py --skus 60000 --dias 365 --salida /tmp/hist.csv
+"""
+
+import argparse
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from analizar_precios_jumbo import ORDEN_CATS
+
+# Proporción real de SKUs por categoría (relevamiento 2026-02-21)
+MIX_CATS = {
+    "Almacén":                 8172,
+    "Bebidas":                 2457,
+    "Congelados":               445,
+    "Lácteos":                 1005,
+    "Quesos y Fiambres":       1548,
+    "Frutas y Verduras":       1101,
+    "Carnes":                   821,
+    "Rotiseria":                193,
+    "Panaderia y Pasteleria":   383,
+    "Limpieza":                2155,
+    "Perfumería":              3644,
+    "Mascotas":                 229,
+    "Hogar y textil":         20704,
+    "Mundo Bebe":               152,
+    "Electro":                 2975,
+    "Tiempo Libre":           12539,
+}
+
+TASA_CAMBIO = 0.009     # fracción de SKUs que cambian de precio por día
+CHURN       = 0.001     # fracción de SKUs que salen (y entran) por día
+SUBCATS     = 8         # cat_padre por cat_principal
+HOJAS       = 4         # categorías nivel 3 por cat_padre
+MARCAS      = 3000
+UNIDADES    = ["gr", "kg", "ml", "lt", "un"]
+
+
+def parse_mix(texto):
+    # "Almacén=0.3,Bebidas=0.1" → {"Almacén": 0.3, "Bebidas": 0.1}
+    mix = {}
+    for parte in texto.split(","):
+        cat, _, peso = parte.partition("=")
+        cat = cat.strip()
+        if cat not in ORDEN_CATS:
+            raise ValueError(f"Categoría desconocida en --mix: {cat!r}")
+        mix[cat] = float(peso)
+    return mix
+
+
+def _catalogo(rng, ids, mix):
+    """Atributos estáticos (nombre, marca, categorías, precio base) de cada SKU nuevo."""
+    cats  = list(mix)
+    pesos = np.array([mix[c] for c in cats], dtype=float)
+    n     = len(ids)
+
+    i_cat   = rng.choice(len(cats), size=n, p=pesos / pesos.sum())
+    i_padre = rng.integers(0, SUBCATS, size=n)
+    i_hoja  = rng.integers(0, HOJAS, size=n)
+    i_marca = rng.integers(0, MARCAS, size=n)
+    tamano  = rng.choice([100, 200, 250, 500, 750, 900, 1, 2, 5], size=n)
+    unidad  = rng.choice(UNIDADES, size=n)
+
+    cat_principal = np.array(cats, dtype=object)[i_cat]
+    cat_padre     = [f"{c} {p}" for c, p in zip(cat_principal, i_padre)]
+    return pd.DataFrame({
+        "sku_id":         ids.astype(str),
+        "nombre":         [f"Producto {s} {t} {u}" for s, t, u in zip(ids, tamano, unidad)],
+        "marca":          [f"MARCA {m}" for m in i_marca],
+        "categoria":      [f"{p} / {h}" for p, h in zip(cat_padre, i_hoja)],
+        "cat_padre":      cat_padre,
+        "cat_principal":  cat_principal,
+        "precio_base":    np.round(np.exp(rng.normal(8.0, 1.2, size=n)), 2),
+    })
+
+
+def generar_historico(n_skus=60000, dias=365, mix=None, tasa_cambio=TASA_CAMBIO,
+                      churn=CHURN, fecha_fin=None, seed=0):
+    """
+    Devuelve un DataFrame con las columnas de preparar_df_dia más cat_padre
+    (una fila por SKU activo por día). Determinístico dado `seed`.
+    """
+    rng       = np.random.default_rng(seed)
+    mix       = mix or MIX_CATS
+    fecha_fin = fecha_fin or datetime.now().strftime("%Y-%m-%d")
+    fin       = datetime.strptime(fecha_fin, "%Y-%m-%d")
+    fechas    = [(fin - timedelta(days=dias - 1 - i)).strftime("%Y-%m-%d") for i in range(dias)]
+
+    catalogo = _catalogo(rng, np.arange(1, n_skus + 1), mix)
+    precios  = catalogo["precio_base"].to_numpy().copy()
+    activos  = np.arange(n_skus)          # índices en `catalogo`
+    prox_id  = n_skus + 1
+
+    dfs = []
+    for fecha in fechas:
+        # Churn: bajas al azar y la misma cantidad de altas
+        n_churn = rng.binomial(len(activos), churn) if churn > 0 else 0
+        if n_churn:
+            bajas   = rng.choice(len(activos), size=n_churn, replace=False)
+            activos = np.delete(activos, bajas)
+            nuevos  = _catalogo(rng, np.arange(prox_id, prox_id + n_churn), mix)
+            prox_id += n_churn
+            activos  = np.concatenate([activos, np.arange(len(catalogo), len(catalogo) + n_churn)])
+            catalogo = pd.concat([catalogo, nuevos], ignore_index=True)
+            precios  = np.concatenate([precios, nuevos["precio_base"].to_numpy()])
+
+        # Cambios de precio: mayoría subas (inflación), algunas bajas/promos
+        cambia = rng.random(len(activos)) < tasa_cambio
+        idx    = activos[cambia]
+        precios[idx] = np.round(precios[idx] * np.exp(rng.normal(0.02, 0.06, size=len(idx))), 2)
+
+        dia = catalogo.iloc[activos].drop(columns="precio_base")
+        dia = dia.assign(precio_actual=precios[activos],
+                         precio_regular=precios[activos],
+                         fecha=fecha)
+        dfs.append(dia)
+
+    return pd.concat(dfs, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera un histórico sintético de precios Jumbo")
+    parser.add_argument("--skus", type=int, default=60000)
+    parser.add_argument("--dias", type=int, default=365)
+    parser.add_argument("--mix", type=parse_mix, default=None,
+                        help='pesos por categoría, p. ej. "Almacén=0.5,Bebidas=0.5"')
+    parser.add_argument("--tasa-cambio", type=float, default=TASA_CAMBIO)
+    parser.add_argument("--churn", type=float, default=CHURN)
+    parser.add_argument("--fecha-fin", default=None, help="YYYY-MM-DD (default: hoy)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--salida", required=True)
+    args = parser.parse_args()
+
+    df = generar_historico(args.skus, args.dias, args.mix, args.tasa_cambio,
+                           args.churn, args.fecha_fin, args.seed)
+    df.to_csv(args.salida, index=False, encoding="utf-8-sig")
+    print(f"✅ Histórico sintético: {args.salida} ({len(df)} filas, "
+          f"{df['sku_id'].nunique()} SKUs, {df['fecha'].nunique()} días)")
+
+
+if __name__ == "__main__":
+    main()
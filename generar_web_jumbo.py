@@ -3,14 +3,59 @@ generar_web_jumbo.py
 ====================
 Lee los JSONs en data/ y genera docs/index.html para GitHub Pages.
 Diseño inspirado en Jumbo: verde (#007a33) sobre fondo oscuro.
+
+Los gráficos y rankings no van embebidos en el HTML: se escriben como
+shards JSON en docs/data/ (uno por período × serie y uno por ranking), con
+hash de contenido en el nombre y versiones .gz/.br precomprimidas. La página
+sólo descarga el shard de la pestaña activa, y los shards que no cambiaron
+quedan en la caché del navegador de un día para otro.
+
+Las series más largas que PUNTOS_MAX se reducen con LTTB
+(Largest-Triangle-Three-Buckets) en el shard por defecto; la serie completa
+queda en un shard aparte que la página pide sólo con "Resolución completa".
+
+El historial de cada producto va en docs/sku/<prefijo>.json, agrupado por
+los primeros dígitos del sku_id y delta-codificado (sólo los días en que
+cambió el precio). Cada día se reescriben sólo los shards con SKUs que
+cambiaron, más los de SKUs cuyos puntos cayeron en días que la
+compactación del histórico sacó.
+
+El buscador usa un índice de prefijos sobre nombre, marca y categoría (sin
+acentos) partido en docs/buscar/<abc>.json según los 3 primeros caracteres
+de cada token; la página baja sólo los shards de las palabras tipeadas.
 """
 
+import argparse
+import gzip
+import hashlib
 import json
+import re
+import sys
+import unicodedata
 from pathlib import Path
 from datetime import datetime
 
-DIR_DATA = Path("data")
-DIR_DOCS = Path("docs")
+import pandas as pd
+
+import analisis_por_bloques as apb
+from analizar_precios_jumbo import TIERS_HISTORICO, cargar_historico
+
+try:
+    import brotli
+except ImportError:          # opcional: sin brotli sólo se generan los .gz
+    brotli = None
+
+DIR_DATA   = Path("data")
+DIR_DOCS   = Path("docs")
+DIR_SHARDS = DIR_DOCS / "data"
+MANIFIESTO_WEB = DIR_DOCS / "manifiesto_web.json"
+PUNTOS_MAX = 120    # presupuesto de puntos por serie en los shards livianos (LTTB)
+DIR_SKU    = DIR_DOCS / "sku"
+PREFIJO_SKU = 3     # los SKUs se agrupan en shards por los primeros N dígitos del id
+EPOCA      = pd.Timestamp("1970-01-01")
+DIR_BUSCAR = DIR_DOCS / "buscar"
+PREFIJO_BUSQUEDA = 3    # shards del índice de búsqueda por los primeros N caracteres del token
+STOPWORDS  = {"con", "sin", "del", "los", "las", "para", "por", "una", "uno"}
 
 ORDEN_CATS = [
     "Almacén",
@@ -66,18 +111,418 @@ def agrupar_graficos(graficos):
     return resultado
 
 
-def main():
-    DIR_DOCS.mkdir(exist_ok=True)
+def lttb(serie, umbral):
+    """
+    Reduce una serie [{"fecha", "pct"}, ...] a `umbral` puntos con
+    Largest-Triangle-Three-Buckets, preservando la forma. El eje x es la
+    fecha (ordinal), así los puntos semanales/mensuales viejos pesan según
+    el tiempo que cubren. El máximo y el mínimo global se conservan siempre.
+    """
+    n = len(serie)
+    if umbral >= n or umbral < 3:
+        return serie
+
+    xs = [datetime.strptime(p["fecha"], "%Y-%m-%d").toordinal() for p in serie]
+    ys = [p["pct"] for p in serie]
+    elegidos = [0]
+    tam = (n - 2) / (umbral - 2)
+    a = 0
+    for i in range(umbral - 2):
+        ini = int(i * tam) + 1
+        fin = int((i + 1) * tam) + 1
+        sig_ini, sig_fin = fin, min(int((i + 2) * tam) + 1, n)
+        avg_x = sum(xs[sig_ini:sig_fin]) / (sig_fin - sig_ini)
+        avg_y = sum(ys[sig_ini:sig_fin]) / (sig_fin - sig_ini)
+
+        mejor, area_max = ini, -1.0
+        for j in range(ini, fin):
+            area = abs((xs[a] - avg_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (avg_y - ys[a]))
+            if area > area_max:
+                mejor, area_max = j, area
+        elegidos.append(mejor)
+        a = mejor
+    elegidos.append(n - 1)
+
+    extremos = {max(range(n), key=ys.__getitem__), min(range(n), key=ys.__getitem__)}
+    return [serie[i] for i in sorted(set(elegidos) | extremos)]
+
+
+def normalizar(texto):
+    # "Lácteos Ñandú" → "lacteos nandu"
+    texto = unicodedata.normalize("NFKD", str(texto)).encode("ascii", "ignore").decode()
+    return texto.lower()
+
+
+def slugificar(texto):
+    return "".join(c if c.isalnum() else "-" for c in normalizar(texto)).strip("-")
+
+
+def escribir_shard(nombre, datos, escritos):
+    """
+    Escribe docs/data/<nombre>.<hash>.json (+ .gz / .br) si no existe y
+    devuelve la URL relativa. `escritos` acumula los archivos vigentes para
+    después borrar los shards viejos.
+    """
+    contenido = json.dumps(datos, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    h = hashlib.sha256(contenido).hexdigest()[:10]
+    archivo = f"{nombre}.{h}.json"
+    ruta = DIR_SHARDS / archivo
+
+    variantes = {ruta: lambda: contenido,
+                 ruta.with_name(archivo + ".gz"): lambda: gzip.compress(contenido, 9, mtime=0)}
+    if brotli is not None:
+        variantes[ruta.with_name(archivo + ".br")] = lambda: brotli.compress(contenido, quality=11)
+    for destino, comprimir in variantes.items():
+        if not destino.exists():
+            destino.write_bytes(comprimir())
+        escritos.add(destino.name)
+    return f"{DIR_SHARDS.name}/{archivo}"
+
+
+def escribir_shards(graficos_agrupados, rankings, puntos_max=PUNTOS_MAX):
+    """
+    Shards de gráficos y rankings. Devuelve el manifiesto {clave: url} para la
+    página; las series reducidas con LTTB tienen además su URL en "completo".
+    """
+    DIR_SHARDS.mkdir(parents=True, exist_ok=True)
+    escritos = set()
+    manifiesto = {"graficos": {}, "rankings": {}}
+
+    def serie_shard(nombre, serie):
+        reducida = lttb(serie, puntos_max)
+        url = escribir_shard(nombre, reducida, escritos)
+        if len(reducida) == len(serie):
+            return url, None
+        return url, escribir_shard(f"{nombre}_completo", serie, escritos)
+
+    for periodo, datos in graficos_agrupados.items():
+        entrada = {"categorias": {}, "completo": {"categorias": {}}}
+        entrada["total"], completo = serie_shard(f"graficos_{periodo}_total", datos["total"])
+        if completo:
+            entrada["completo"]["total"] = completo
+        for cat, serie in datos["categorias"].items():
+            url, completo = serie_shard(f"graficos_{periodo}_{slugificar(cat)}", serie)
+            entrada["categorias"][cat] = url
+            if completo:
+                entrada["completo"]["categorias"][cat] = completo
+        manifiesto["graficos"][periodo] = entrada
+
+    for clave, datos in rankings.items():
+        manifiesto["rankings"][clave] = escribir_shard(f"ranking_{clave}", datos, escritos)
+
+    # Borrar shards de corridas anteriores que ya no se referencian
+    for viejo in DIR_SHARDS.glob("*.json*"):
+        if viejo.name not in escritos:
+            viejo.unlink()
+    return manifiesto
+
+
+# ──────────────────────────────────────────────
+# Historial por SKU
+# ──────────────────────────────────────────────
+def prefijo_sku(sku_id):
+    return str(sku_id)[:PREFIJO_SKU]
+
+
+def skus_cambiados(df_hist, fecha_ant, fecha_hoy):
+    """SKUs nuevos, dados de baja, con cambio de precio o renombrados entre dos fechas."""
+    cols = ["sku_id", "precio_actual", "nombre"]
+    hoy = df_hist.loc[df_hist["fecha"] == fecha_hoy, cols]
+    ant = df_hist.loc[df_hist["fecha"] == fecha_ant, cols]
+    m = hoy.merge(ant, on="sku_id", how="outer", suffixes=("_hoy", "_ant"), indicator=True)
+    cambio = ((m["_merge"] != "both")
+              | (m["precio_actual_hoy"] != m["precio_actual_ant"])
+              | (m["nombre_hoy"] != m["nombre_ant"]))
+    return set(m.loc[cambio, "sku_id"])
+
+
+def _dias_entrada(entrada):
+    # "d" delta-codificado → días absolutos
+    dias, acum = [], 0
+    for delta in entrada["d"]:
+        acum += delta
+        dias.append(acum)
+    return dias
+
+
+def skus_en_dias(dias_quitados):
+    """
+    SKUs de los shards ya escritos con un punto (cambio de precio, primer o
+    último día) en alguno de `dias_quitados`. Son los únicos cuyo historial
+    cambia cuando la compactación saca esos días del histórico: para el
+    resto, los días quitados repetían el precio anterior.
+    """
+    skus = set()
+    for ruta in DIR_SKU.glob("*.json"):
+        if ruta.name == "index.json":
+            continue
+        for sku, entrada in json.loads(ruta.read_text(encoding="utf-8")).items():
+            if entrada.get("u") in dias_quitados or dias_quitados.intersection(_dias_entrada(entrada)):
+                skus.add(sku)
+    return skus
+
+
+def historial_compacto(df, ultimo_dia=None):
+    """
+    {sku_id: {"n": nombre, "m": marca, "d": [días], "p": [centavos], "u": último_día?}}
+    "d" (días desde 1970-01-01) y "p" (precio en centavos) van delta-codificados
+    y sólo incluyen los puntos donde cambió el precio. "u" aparece sólo si el
+    SKU no estaba en `ultimo_dia` (default: el último día de df), con el
+    último día en que se lo vio.
+    """
+    d = df[["sku_id", "fecha", "precio_actual", "nombre", "marca"]].sort_values(["sku_id", "fecha"])
+    d = d.assign(
+        dia=(pd.to_datetime(d["fecha"]) - EPOCA).dt.days,
+        c=(d["precio_actual"] * 100).round().astype("int64"),
+    )
+    if ultimo_dia is None:
+        ultimo_dia = int(d["dia"].max()) if not d.empty else 0
+    d["cambio"] = d.groupby("sku_id")["c"].diff().ne(0)
+    ultimos = d.groupby("sku_id").tail(1).set_index("sku_id")
+
+    salida = {}
+    for sku, g in d[d["cambio"]].groupby("sku_id", sort=True):
+        dias = g["dia"].to_numpy()
+        cent = g["c"].to_numpy()
+        u = ultimos.loc[sku]
+        entrada = {
+            "n": u["nombre"] if isinstance(u["nombre"], str) else "",
+            "m": u["marca"] if isinstance(u["marca"], str) else "",
+            "d": [int(dias[0])] + [int(x) for x in dias[1:] - dias[:-1]],
+            "p": [int(cent[0])] + [int(x) for x in cent[1:] - cent[:-1]],
+        }
+        if int(u["dia"]) < ultimo_dia:
+            entrada["u"] = int(u["dia"])
+        salida[sku] = entrada
+    return salida
+
+
+def escribir_si_cambia(ruta, contenido):
+    ruta = Path(ruta)
+    if ruta.exists() and ruta.read_bytes() == contenido:
+        return False
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    ruta.write_bytes(contenido)
+    return True
+
+
+def _dia(fecha):
+    return int((pd.Timestamp(fecha) - EPOCA).days)
+
+
+def prefijos_a_regenerar(df_rec, fechas, prefijos_todos):
+    """
+    Prefijos de docs/sku/ a regenerar. Si el índice dice que ayer ya se
+    procesó, sólo los de SKUs que cambiaron hoy y los de SKUs con puntos en
+    días que la compactación sacó del histórico; si no (primera corrida,
+    días salteados o agregados), todos. `df_rec` tiene que incluir al menos
+    las dos últimas de `fechas` (todas las fechas del histórico).
+    """
+    ruta_indice = DIR_SKU / "index.json"
+    indice = json.loads(ruta_indice.read_text(encoding="utf-8")) if ruta_indice.exists() else {}
+    dias = [_dia(f) for f in fechas]
+    previos = set(indice.get("dias", []))
+    if not (len(fechas) >= 2 and indice.get("prefijo") == PREFIJO_SKU
+            and indice.get("ultima") in (fechas[-2], fechas[-1])
+            and previos and not set(dias[:-1]) - previos):
+        return set(prefijos_todos)
+
+    cambiados = skus_cambiados(df_rec, fechas[-2], fechas[-1])
+    quitados = previos - set(dias)
+    if quitados:
+        movidos = skus_en_dias(quitados)
+        print(f"  Historial por SKU: {len(quitados)} días compactados, {len(movidos)} SKUs afectados")
+        cambiados |= movidos
+    return {prefijo_sku(s) for s in cambiados}
+
+
+def escribir_shards_sku(df, prefijos, ultimo_dia):
+    """Reescribe los shards de `prefijos` con las filas de df (todas las de esos prefijos)."""
+    por_prefijo = {}
+    for sku, entrada in historial_compacto(df, ultimo_dia).items():
+        por_prefijo.setdefault(prefijo_sku(sku), {})[sku] = entrada
+    escritos = 0
+    for pref in prefijos:
+        contenido = json.dumps(por_prefijo.get(pref, {}), ensure_ascii=False,
+                               separators=(",", ":")).encode("utf-8")
+        escritos += escribir_si_cambia(DIR_SKU / f"{pref}.json", contenido)
+    return escritos
+
+
+def cerrar_historial_skus(fechas, prefijos_todos):
+    # Shards de prefijos que ya no existen
+    for viejo in DIR_SKU.glob("*.json"):
+        if viejo.name != "index.json" and viejo.stem not in prefijos_todos:
+            viejo.unlink()
+
+    # "dias": días del histórico ya volcados, para detectar los que la compactación saca
+    dias = [_dia(f) for f in fechas]
+    indice = {"ultima": fechas[-1], "prefijo": PREFIJO_SKU, "ultimo_dia": dias[-1], "dias": dias}
+    escribir_si_cambia(DIR_SKU / "index.json", json.dumps(indice).encode("utf-8"))
+
+
+def escribir_historial_skus(df_hist):
+    """Escribe docs/sku/<prefijo>.json (sólo los prefijos de prefijos_a_regenerar) e index.json."""
+    if df_hist is None or df_hist.empty:
+        return
+    fechas = sorted(df_hist["fecha"].unique())
+    prefijos_sku = df_hist["sku_id"].astype(str).str[:PREFIJO_SKU]
+    prefijos_todos = set(prefijos_sku.unique())
+    prefijos = prefijos_a_regenerar(df_hist, fechas, prefijos_todos)
+    if prefijos:
+        escritos = escribir_shards_sku(df_hist[prefijos_sku.isin(prefijos)], prefijos, _dia(fechas[-1]))
+        print(f"  Historial por SKU: {escritos}/{len(prefijos_todos)} shards reescritos")
+    cerrar_historial_skus(fechas, prefijos_todos)
+
+
+def escribir_historico_por_bloques(memoria_max):
+    """
+    Historial por SKU y buscador sin cargar el histórico entero: una pasada
+    cuenta fechas y filas por prefijo, el buscador usa sólo las dos últimas
+    fechas y los shards de SKU se arman por lotes de prefijos que entran en
+    memoria_max (MB). Corta con MemoryError si un lote no entra.
+    """
+    presupuesto = apb.PresupuestoMemoria(memoria_max, apb.bytes_por_fila(TIERS_HISTORICO))
+    fechas, filas_por_prefijo = apb.contar_prefijos(TIERS_HISTORICO, presupuesto.filas_bloque, PREFIJO_SKU)
+    if not fechas:
+        return
+    recientes = set(fechas[-2:])
+    df_rec = apb.leer_filtrado(TIERS_HISTORICO, presupuesto, lambda b: b["fecha"].isin(recientes),
+                               "ultimos_dias")
+    escribir_indice_busqueda(df_rec)
+
+    prefijos_todos = set(filas_por_prefijo)
+    prefijos = prefijos_a_regenerar(df_rec, fechas, prefijos_todos)
+    escritos = lotes = 0
+    for lote, df in apb.lotes_por_prefijo(prefijos, filas_por_prefijo, presupuesto, PREFIJO_SKU):
+        escritos += escribir_shards_sku(df, lote, _dia(fechas[-1]))
+        lotes += 1
+    if prefijos:
+        print(f"  Historial por SKU: {escritos}/{len(prefijos_todos)} shards reescritos "
+              f"({lotes} lotes, memoria máx. {memoria_max} MB)")
+    cerrar_historial_skus(fechas, prefijos_todos)
+
+
+# ──────────────────────────────────────────────
+# Índice de búsqueda
+# ──────────────────────────────────────────────
+def tokens_busqueda(*campos):
+    tokens = set()
+    for campo in campos:
+        if isinstance(campo, str):
+            tokens.update(re.findall(r"[a-z0-9]+", normalizar(campo)))
+    return {t for t in tokens
+            if len(t) >= PREFIJO_BUSQUEDA and not t.isdigit() and t not in STOPWORDS}
+
+
+def _docs_dia(df_hist, fecha):
+    d = df_hist.loc[df_hist["fecha"] == fecha, ["sku_id", "nombre", "marca", "categoria"]]
+    d = d.drop_duplicates("sku_id", keep="last").fillna("")
+    return {r.sku_id: (r.nombre, r.marca, r.categoria) for r in d.itertuples(index=False)}
+
 
-    resumen   = leer_json("resumen.json") or {}
-    graficos  = leer_json("graficos.json") or {}
-    rank_dia  = leer_json("ranking_dia.json") or []
-    rank_mes  = leer_json("ranking_mes.json") or []
-    rank_anio = leer_json("ranking_anio.json") or []
+def escribir_indice_busqueda(df_hist):
+    """
+    docs/buscar/<abc>.json = {"t": {token: [sku, ...]}, "d": {sku: [nombre, marca]}}
+    para todos los tokens que empiezan con <abc>. En modo incremental se
+    abren sólo los shards que tocan los SKUs nuevos, dados de baja o con
+    texto distinto al de ayer, se sacan esos SKUs y se vuelven a agregar
+    con su texto de hoy.
+    """
+    if df_hist is None or df_hist.empty:
+        return
+    fechas = sorted(df_hist["fecha"].unique())
+    ruta_indice = DIR_BUSCAR / "index.json"
+    indice = json.loads(ruta_indice.read_text(encoding="utf-8")) if ruta_indice.exists() else {}
+    hoy = _docs_dia(df_hist, fechas[-1])
 
-    graficos_agrupados = agrupar_graficos(graficos)
+    incremental = (len(fechas) >= 2 and indice.get("prefijo") == PREFIJO_BUSQUEDA
+                   and indice.get("ultima") in (fechas[-2], fechas[-1]))
+    if incremental:
+        ayer = _docs_dia(df_hist, fechas[-2])
+        cambiados = {s for s in hoy.keys() | ayer.keys() if hoy.get(s) != ayer.get(s)}
+        tokens_de = {s: tokens_busqueda(*hoy[s]) for s in cambiados if s in hoy}
+        afectados = set()
+        for s in cambiados:
+            afectados |= {t[:PREFIJO_BUSQUEDA] for t in tokens_de.get(s, set())}
+            if s in ayer:
+                afectados |= {t[:PREFIJO_BUSQUEDA] for t in tokens_busqueda(*ayer[s])}
+        shards = {}
+        for pref in afectados:
+            ruta = DIR_BUSCAR / f"{pref}.json"
+            shard = json.loads(ruta.read_text(encoding="utf-8")) if ruta.exists() else {"t": {}, "d": {}}
+            for token in list(shard["t"]):
+                quedan = [s for s in shard["t"][token] if s not in cambiados]
+                if quedan:
+                    shard["t"][token] = quedan
+                else:
+                    del shard["t"][token]
+            for s in cambiados:
+                shard["d"].pop(s, None)
+            shards[pref] = shard
+    else:
+        cambiados = set(hoy)
+        tokens_de = {s: tokens_busqueda(*hoy[s]) for s in cambiados}
+        shards = {}
+        for viejo in DIR_BUSCAR.glob("*.json"):
+            viejo.unlink()
 
-    fecha_str = datetime.now().strftime("%d/%m/%Y %H:%M")
+    for s, tokens in tokens_de.items():
+        for t in tokens:
+            shard = shards.setdefault(t[:PREFIJO_BUSQUEDA], {"t": {}, "d": {}})
+            shard["t"].setdefault(t, []).append(s)
+            shard["d"][s] = [hoy[s][0], hoy[s][1]]
+
+    escritos = 0
+    for pref, shard in shards.items():
+        ruta = DIR_BUSCAR / f"{pref}.json"
+        if not shard["t"]:
+            if ruta.exists():
+                ruta.unlink()
+            continue
+        shard["t"] = {t: sorted(v) for t, v in sorted(shard["t"].items())}
+        shard["d"] = dict(sorted(shard["d"].items()))
+        contenido = json.dumps(shard, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        escritos += escribir_si_cambia(ruta, contenido)
+    print(f"  Índice de búsqueda: {escritos} shards reescritos "
+          f"({'incremental' if incremental else 'completo'}, {len(cambiados)} SKUs)")
+
+    indice = {"ultima": fechas[-1], "prefijo": PREFIJO_BUSQUEDA}
+    escribir_si_cambia(ruta_indice, json.dumps(indice).encode("utf-8"))
+
+
+def hash_contenido(*partes):
+    h = hashlib.sha256()
+    for parte in partes:
+        if not isinstance(parte, bytes):
+            parte = json.dumps(parte, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        h.update(parte)
+    return h.hexdigest()[:16]
+
+
+def hash_archivos(rutas):
+    h = hashlib.sha256()
+    for ruta in rutas:
+        h.update(str(ruta).encode("utf-8"))
+        with open(ruta, "rb") as f:
+            for bloque in iter(lambda: f.read(1 << 20), b""):
+                h.update(bloque)
+    return h.hexdigest()[:16]
+
+
+def _urls(manifiesto):
+    if isinstance(manifiesto, dict):
+        for v in manifiesto.values():
+            yield from _urls(v)
+    elif isinstance(manifiesto, str):
+        yield manifiesto
+
+
+def renderizar_html(resumen, manifiesto):
+    # Fecha de los datos (no de la generación), así regenerar sin datos nuevos
+    # produce exactamente el mismo HTML
+    fecha_datos = resumen.get("fecha_actualizacion")
+    fecha_str = datetime.strptime(fecha_datos, "%Y-%m-%d").strftime("%d/%m/%Y") if fecha_datos else "—"
     var_dia   = resumen.get("variacion_dia")
     var_mes   = resumen.get("variacion_mes")
     var_anio  = resumen.get("variacion_anio")
@@ -98,11 +543,7 @@ def main():
         if v is None: return "#888"
         return "#ef4444" if v > 0 else ("#22c55e" if v < 0 else "#888")
 
-    graficos_js  = json.dumps(graficos_agrupados, ensure_ascii=False)
-    rank_dia_js  = json.dumps(rank_dia[:20], ensure_ascii=False)
-    rank_mes_js  = json.dumps(rank_mes[:20], ensure_ascii=False)
-    rank_anio_js = json.dumps(rank_anio[:20], ensure_ascii=False)
-    rank_baja_js = json.dumps(resumen.get("ranking_baja_dia", [])[:10], ensure_ascii=False)
+    manifiesto_js = json.dumps(manifiesto, ensure_ascii=False)
 
     filas_cats = ""
     for cat in cats_dia_ord:
@@ -174,6 +615,7 @@ def main():
     font-family: 'IBM Plex Mono', monospace; font-size: 0.8rem; transition: all 0.2s;
   }}
   .tab.active, .tab:hover {{ background: var(--accent2); color: #fff; border-color: var(--accent2); }}
+  .toggle-completo {{ margin-left: auto; display: flex; align-items: center; gap: 0.4rem; font-size: 0.75rem; color: var(--muted); font-family: 'IBM Plex Mono', monospace; }}
   .chart-container {{
     background: var(--surface); border: 1px solid var(--border);
     border-radius: 12px; padding: 1.5rem; position: relative; height: 320px;
@@ -194,6 +636,13 @@ def main():
     background: transparent; color: var(--muted); cursor: pointer; font-size: 0.8rem; transition: all 0.2s;
   }}
   .rank-tab.active {{ background: var(--surface); color: var(--text); border-color: var(--accent2); }}
+  .buscador {{
+    width: 100%; padding: 0.7rem 1rem; border-radius: 8px; border: 1px solid var(--border);
+    background: var(--surface); color: var(--text); font-size: 0.95rem; font-family: 'IBM Plex Sans', sans-serif;
+  }}
+  .buscador:focus {{ outline: none; border-color: var(--accent2); }}
+  .resultados div {{ padding: 0.5rem 1rem; border-bottom: 1px solid var(--border); cursor: pointer; font-size: 0.88rem; }}
+  .resultados div:hover {{ background: rgba(0,167,66,0.06); }}
   .grid2 {{ display: grid; grid-template-columns: 1fr 1fr; gap: 1.5rem; }}
   @media (max-width: 700px) {{ .grid2 {{ grid-template-columns: 1fr; }} }}
   footer {{
@@ -250,6 +699,13 @@ def main():
     </div>
   </div>
 
+  <div class="section">
+    <div class="section-title">🔎 Buscar producto</div>
+    <input id="buscador" class="buscador" type="search" autocomplete="off"
+           placeholder="Nombre, marca o categoría (mín. 3 letras)…" oninput="buscarDebounced()">
+    <div id="resultadosBusqueda" class="resultados"></div>
+  </div>
+
   <div class="section">
     <div class="section-title">📈 Evolución de precios</div>
     <div class="tabs">
@@ -257,6 +713,7 @@ def main():
       <button class="tab" onclick="cambiarPeriodo('30d',this)">30 días</button>
       <button class="tab" onclick="cambiarPeriodo('6m',this)">6 meses</button>
       <button class="tab" onclick="cambiarPeriodo('1y',this)">1 año</button>
+      <label class="toggle-completo"><input type="checkbox" id="resCompleta" onchange="cambiarResolucion()"> Resolución completa</label>
     </div>
     <div class="chart-container"><canvas id="chartGeneral"></canvas></div>
   </div>
@@ -301,6 +758,12 @@ def main():
       </div>
     </div>
   </div>
+
+  <div class="section" id="seccionProducto" style="display:none">
+    <div class="section-title">🔎 Historial de producto</div>
+    <div id="productoTitulo" style="margin-bottom:0.8rem;font-size:0.9rem"></div>
+    <div class="chart-container"><canvas id="chartProducto"></canvas></div>
+  </div>
 </div>
 
 <footer>
@@ -309,24 +772,45 @@ def main():
 </footer>
 
 <script>
-const GRAFICOS   = {graficos_js};
-const RANK_DIA   = {rank_dia_js};
-const RANK_MES   = {rank_mes_js};
-const RANK_ANIO  = {rank_anio_js};
-const RANK_BAJA  = {rank_baja_js};
+const MANIFIESTO = {manifiesto_js};
 const CATS_DEFAULT = {json.dumps(ORDEN_CATS)};
+const PREFIJO_SKU  = {PREFIJO_SKU};
+
+let chartGeneral = null, chartCat = null, catActual = null, periodoActual = '7d';
+
+// Cada shard se pide una sola vez; el nombre lleva hash, así que el navegador
+// puede cachearlo indefinidamente.
+const _shards = new Map();
+function cargarShard(url) {{
+  if (!url) return Promise.resolve([]);
+  if (!_shards.has(url)) _shards.set(url, fetch(url).then(r => r.ok ? r.json() : []).catch(() => []));
+  return _shards.get(url);
+}}
 
-let chartGeneral = null, chartCat = null, catActual = null;
+// Con "Resolución completa" se usa el shard sin reducir, si existe
+function urlSerie(periodo, cat) {{
+  const g = MANIFIESTO.graficos[periodo] || {{}};
+  const completa = document.getElementById('resCompleta').checked;
+  if (cat === null) return (completa && g.completo?.total) || g.total;
+  return (completa && g.completo?.categorias?.[cat]) || g.categorias?.[cat];
+}}
+
+function cambiarResolucion() {{
+  renderChartGeneral(periodoActual);
+  renderChartCat(periodoActual, catActual);
+}}
 
 function cambiarPeriodo(periodo, btn) {{
-  document.querySelectorAll('.tab').forEach(t => t.classList.remove('active'));
+  document.querySelectorAll('.tabs > .tab').forEach(t => t.classList.remove('active'));
   btn.classList.add('active');
+  periodoActual = periodo;
   renderChartGeneral(periodo);
   renderSelectorCats(periodo);
 }}
 
-function renderChartGeneral(periodo) {{
-  const datos = GRAFICOS[periodo]?.total || [];
+async function renderChartGeneral(periodo) {{
+  const datos = await cargarShard(urlSerie(periodo, null));
+  if (periodo !== periodoActual) return;
   if (chartGeneral) chartGeneral.destroy();
   const ctx = document.getElementById('chartGeneral').getContext('2d');
   chartGeneral = new Chart(ctx, {{
@@ -351,7 +835,7 @@ function renderChartGeneral(periodo) {{
 }}
 
 function renderSelectorCats(periodo) {{
-  const catsJSON = Object.keys(GRAFICOS[periodo]?.categorias || {{}});
+  const catsJSON = Object.keys(MANIFIESTO.graficos[periodo]?.categorias || {{}});
   const cats = catsJSON.length ? catsJSON : CATS_DEFAULT;
   const cont = document.getElementById('selectorCat');
   cont.innerHTML = '';
@@ -371,8 +855,9 @@ function renderSelectorCats(periodo) {{
   renderChartCat(periodo, catActual);
 }}
 
-function renderChartCat(periodo, cat) {{
-  const datos = GRAFICOS[periodo]?.categorias?.[cat] || [];
+async function renderChartCat(periodo, cat) {{
+  const datos = await cargarShard(urlSerie(periodo, cat));
+  if (periodo !== periodoActual || cat !== catActual) return;
   if (chartCat) chartCat.destroy();
   const ctx = document.getElementById('chartCat').getContext('2d');
   chartCat = new Chart(ctx, {{
@@ -396,12 +881,12 @@ function renderChartCat(periodo, cat) {{
   }});
 }}
 
-function mostrarRanking(periodo, btn) {{
+async function mostrarRanking(periodo, btn) {{
   document.querySelectorAll('.rank-tab').forEach(t => t.classList.remove('active'));
   btn.classList.add('active');
-  const data = {{dia:RANK_DIA, mes:RANK_MES, anio:RANK_ANIO}}[periodo] || [];
+  const data = await cargarShard(MANIFIESTO.rankings[periodo]);
   renderTablaRanking('tabla-sube', data, false);
-  if (periodo==='dia') renderTablaRanking('tabla-baja', RANK_BAJA, true);
+  if (periodo==='dia') renderTablaRanking('tabla-baja', await cargarShard(MANIFIESTO.rankings.baja), true);
   else document.getElementById('tabla-baja').innerHTML = '<tr><td colspan="4" style="color:var(--muted);text-align:center;padding:1rem">Solo disponible para hoy</td></tr>';
 }}
 
@@ -416,7 +901,7 @@ function renderTablaRanking(id, data, esBaja) {{
     const signo = p.diff_pct > 0 ? '+' : '';
     const nombre = (p.nombre||'').substring(0,35);
     const precio = p.precio_hoy ? '$'+Number(p.precio_hoy).toLocaleString('es-AR') : '—';
-    return `<tr>
+    return `<tr style="cursor:pointer" onclick="verProducto('${{p.sku_id}}')">
       <td class="rank-num">${{i+1}}</td>
       <td title="${{p.nombre}}"><div>${{nombre}}</div><div style="font-size:0.7rem;color:var(--muted)">${{p.marca||''}} · ${{(p.categoria||'').substring(0,20)}}</div></td>
       <td style="color:${{color}};font-weight:700;font-family:'IBM Plex Mono',monospace">${{signo}}${{p.diff_pct?.toFixed(1)}}%</td>
@@ -425,17 +910,183 @@ function renderTablaRanking(id, data, esBaja) {{
   }}).join('');
 }}
 
+// Historial de un producto: un único shard docs/sku/<prefijo>.json,
+// con días y precios (centavos) delta-codificados.
+let chartProducto = null;
+async function verProducto(sku) {{
+  sku = String(sku);
+  const [shard, indice] = await Promise.all([
+    cargarShard('sku/' + sku.slice(0, PREFIJO_SKU) + '.json'),
+    cargarShard('sku/index.json'),
+  ]);
+  const e = shard[sku];
+  if (!e) return;
+  const puntos = [];
+  let dia = 0, cent = 0;
+  e.d.forEach((dd, i) => {{
+    dia += dd; cent += e.p[i];
+    puntos.push({{ x: dia, y: cent / 100 }});
+  }});
+  const fin = e.u ?? indice.ultimo_dia;
+  if (fin > dia) puntos.push({{ x: fin, y: cent / 100 }});
+  const fecha = d => new Date(d * 864e5).toISOString().slice(0, 10);
+
+  document.getElementById('seccionProducto').style.display = '';
+  document.getElementById('productoTitulo').innerHTML =
+    `<strong>${{e.n}}</strong> <span style="color:var(--muted)">· ${{e.m}} · SKU ${{sku}}</span>` +
+    (e.u ? ` <span style="color:var(--red)">· sin stock desde ${{fecha(e.u)}}</span>` : '');
+  if (chartProducto) chartProducto.destroy();
+  chartProducto = new Chart(document.getElementById('chartProducto').getContext('2d'), {{
+    type: 'line',
+    data: {{
+      labels: puntos.map(p => fecha(p.x)),
+      datasets: [{{ label: 'Precio', data: puntos.map(p => p.y), stepped: true,
+        borderColor: '#00a742', backgroundColor: 'rgba(0,167,66,0.08)',
+        borderWidth: 2, pointRadius: puntos.length > 60 ? 0 : 3, fill: true }}]
+    }},
+    options: {{
+      responsive: true, maintainAspectRatio: false,
+      plugins: {{ legend: {{ display: false }} }},
+      scales: {{
+        x: {{ ticks: {{ color: '#5a7a5a', maxTicksLimit: 8 }}, grid: {{ color: '#1e2e1e' }} }},
+        y: {{ ticks: {{ color: '#5a7a5a', callback: v => '$' + v.toLocaleString('es-AR') }}, grid: {{ color: '#1e2e1e' }} }}
+      }}
+    }}
+  }});
+  history.replaceState(null, '', '#sku=' + sku);
+  document.getElementById('seccionProducto').scrollIntoView({{ behavior: 'smooth' }});
+}}
+
+// Buscador: cada palabra baja el shard de sus 3 primeras letras y se
+// intersectan los SKUs de los tokens que empiezan con esa palabra.
+const PREFIJO_BUSQUEDA = {PREFIJO_BUSQUEDA};
+const normalizar = t => t.normalize('NFD').replace(/[\\u0300-\\u036f]/g, '').toLowerCase();
+let _timerBusqueda = null;
+function buscarDebounced() {{
+  clearTimeout(_timerBusqueda);
+  _timerBusqueda = setTimeout(buscar, 150);
+}}
+
+async function buscar() {{
+  const q = document.getElementById('buscador').value;
+  const palabras = normalizar(q).split(/[^a-z0-9]+/)
+    .filter(w => w.length >= PREFIJO_BUSQUEDA && !/^[0-9]+$/.test(w));
+  const cont = document.getElementById('resultadosBusqueda');
+  if (!palabras.length) {{ cont.innerHTML = ''; return; }}
+
+  const shards = await Promise.all(palabras.map(w => cargarShard('buscar/' + w.slice(0, PREFIJO_BUSQUEDA) + '.json')));
+  if (document.getElementById('buscador').value !== q) return;
+  let skus = null;
+  const docs = {{}};
+  palabras.forEach((w, i) => {{
+    const sh = shards[i] || {{}};
+    const encontrados = new Set();
+    Object.entries(sh.t || {{}}).forEach(([tok, lista]) => {{
+      if (tok.startsWith(w)) lista.forEach(s => encontrados.add(s));
+    }});
+    Object.assign(docs, sh.d || {{}});
+    skus = skus === null ? encontrados : new Set([...skus].filter(s => encontrados.has(s)));
+  }});
+  const res = [...skus].slice(0, 20);
+  cont.innerHTML = res.length
+    ? res.map(s => `<div onclick="verProducto('${{s}}')">${{docs[s][0]}} <span style="color:var(--muted);font-size:0.75rem">· ${{docs[s][1]}}</span></div>`).join('')
+    : '<div style="color:var(--muted);cursor:default">Sin resultados</div>';
+}}
+
 renderChartGeneral('7d');
 renderSelectorCats('7d');
+const _skuHash = location.hash.match(/sku=([0-9A-Za-z]+)/);
+if (_skuHash) verProducto(_skuHash[1]);
 mostrarRanking('dia', document.querySelector('.rank-tab'));
 </script>
 </body>
 </html>"""
 
+    return html
+
+
+def generar_web(datos=None, puntos_max=PUNTOS_MAX, df_hist=None, memoria_max=None):
+    """
+    Genera docs/index.html y los datos de la web. `datos` ({nombre_archivo:
+    contenido}, como lo devuelve analizar_precios_jumbo.ejecutar_analisis)
+    evita releer data/; lo que no venga ahí se lee del JSON correspondiente.
+    Lo mismo con df_hist para el historial por SKU. Sin df_hist y con
+    memoria_max (MB), el historial por SKU y el buscador se arman por
+    bloques en vez de cargar el histórico.
+
+    docs/manifiesto_web.json guarda el hash de las entradas de cada sección
+    (histórico → sku/ y buscar/, gráficos y rankings → data/, resumen y
+    shards → index.html). Una sección cuyas entradas no cambiaron no se
+    vuelve a generar y sus archivos quedan intactos.
+    """
+    DIR_DOCS.mkdir(exist_ok=True)
+    datos   = datos or {}
+    version = hashlib.sha256(Path(__file__).read_bytes()).hexdigest()[:12]
+    estado  = json.loads(MANIFIESTO_WEB.read_text(encoding="utf-8")) if MANIFIESTO_WEB.exists() else {}
+    previas = estado.get("entradas", {})
+    entradas = {}
+
+    # 1) Historial por SKU y buscador ← archivos del histórico
+    tiers = [r for r in TIERS_HISTORICO if Path(r).exists()]
+    entradas["historico"] = hash_contenido(version, hash_archivos(tiers))
+    if (entradas["historico"] != previas.get("historico")
+            or not (DIR_SKU / "index.json").exists() or not (DIR_BUSCAR / "index.json").exists()):
+        if df_hist is None and memoria_max:
+            escribir_historico_por_bloques(memoria_max)
+        else:
+            if df_hist is None:
+                df_hist = cargar_historico()
+            escribir_historial_skus(df_hist)
+            escribir_indice_busqueda(df_hist)
+    else:
+        print("  Historial por SKU y buscador: sin cambios")
+
+    def leer(nombre):
+        return datos[nombre] if nombre in datos else leer_json(nombre)
+
+    resumen   = leer("resumen.json") or {}
+    graficos  = leer("graficos.json") or {}
+    rankings  = {
+        "dia":  (leer("ranking_dia.json") or [])[:20],
+        "mes":  (leer("ranking_mes.json") or [])[:20],
+        "anio": (leer("ranking_anio.json") or [])[:20],
+        "baja": resumen.get("ranking_baja_dia", [])[:10],
+    }
+
+    # 2) Shards de gráficos y rankings ← graficos.json, ranking_*.json
+    entradas["shards"] = hash_contenido(version, puntos_max, graficos, rankings)
+    manifiesto = estado.get("shards")
+    if (entradas["shards"] != previas.get("shards") or not manifiesto
+            or not all((DIR_DOCS / url).exists() for url in _urls(manifiesto))):
+        manifiesto = escribir_shards(agrupar_graficos(graficos), rankings, puntos_max)
+    else:
+        print("  Shards de gráficos y rankings: sin cambios")
+
+    # 3) index.html ← resumen + manifiesto de shards
     ruta = DIR_DOCS / "index.html"
-    with open(ruta, "w", encoding="utf-8") as f:
-        f.write(html)
-    print(f"✅ Web generada: {ruta}")
+    entradas["html"] = hash_contenido(version, resumen, manifiesto)
+    if entradas["html"] != previas.get("html") or not ruta.exists():
+        escribir_si_cambia(ruta, renderizar_html(resumen, manifiesto).encode("utf-8"))
+        print(f"✅ Web generada: {ruta}")
+    else:
+        print(f"✅ Web sin cambios: {ruta}")
+
+    estado = {"entradas": entradas, "shards": manifiesto}
+    escribir_si_cambia(MANIFIESTO_WEB, json.dumps(estado, ensure_ascii=False, indent=1).encode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera docs/index.html desde data/")
+    parser.add_argument("--puntos-max", type=int, default=PUNTOS_MAX,
+                        help="puntos por serie en los gráficos livianos (LTTB)")
+    parser.add_argument("--memoria-max", type=int, default=None, metavar="MB",
+                        help="arma el historial por SKU y el buscador por bloques, sin superar MB")
+    args = parser.parse_args()
+    try:
+        generar_web(puntos_max=args.puntos_max, memoria_max=args.memoria_max)
+    except MemoryError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
 
 
 if __name__ == "__main__":
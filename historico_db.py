@@ -0,0 +1,179 @@
+"""
+historico_db.py
+===============
+Índice SQLite (archivo único, sin servidor) sobre el histórico de precios.
+
+data/precios_compacto.csv sigue siendo la fuente de verdad; esta base es un
+índice derivado y opcional (se crea con `consultar_precios.py reconstruir`)
+que, si existe, actualizar_historico mantiene sincronizado, para que las
+consultas por SKU, categoría o marca no tengan que leer todo el CSV.
+
+Índices:
+  - (sku_id, fecha)        clave primaria → historial de un SKU
+  - (fecha, cat_principal)               → una categoría en una fecha
+  - (marca, fecha)                       → productos de una marca
+"""
+
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+NOMBRE_DB = "precios.sqlite"
+RUTA_DB   = Path("data") / NOMBRE_DB
+
+COLUMNAS = ["sku_id", "fecha", "nombre", "marca", "categoria", "cat_padre",
+            "cat_principal", "precio_actual", "precio_regular"]
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS precios (
+    sku_id          TEXT NOT NULL,
+    fecha           TEXT NOT NULL,
+    nombre          TEXT,
+    marca           TEXT,
+    categoria       TEXT,
+    cat_padre       TEXT,
+    cat_principal   TEXT,
+    precio_actual   REAL,
+    precio_regular  REAL,
+    PRIMARY KEY (sku_id, fecha)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_precios_fecha_cat ON precios (fecha, cat_principal);
+CREATE INDEX IF NOT EXISTS idx_precios_marca     ON precios (marca, fecha);
+CREATE TABLE IF NOT EXISTS fechas (
+    fecha  TEXT PRIMARY KEY,
+    filas  INTEGER NOT NULL
+);
+"""
+
+
+def conectar(ruta=RUTA_DB):
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(ruta)
+    con.executescript(ESQUEMA)
+    return con
+
+
+def fechas_cargadas(con):
+    return [f for (f,) in con.execute("SELECT fecha FROM fechas ORDER BY fecha")]
+
+
+def _insertar(con, df):
+    df = df.reindex(columns=COLUMNAS)
+    df = df.astype(object).where(df.notna(), None)
+    con.executemany(
+        f"INSERT OR REPLACE INTO precios ({', '.join(COLUMNAS)}) "
+        f"VALUES ({', '.join('?' * len(COLUMNAS))})",
+        df.itertuples(index=False, name=None),
+    )
+
+
+def _reemplazar_fecha(con, fecha, df_fecha):
+    con.execute("DELETE FROM precios WHERE fecha = ?", (fecha,))
+    _insertar(con, df_fecha)
+    con.execute("INSERT OR REPLACE INTO fechas (fecha, filas) VALUES (?, ?)", (fecha, len(df_fecha)))
+
+
+def _cargar_faltantes(con, bloques, excluir):
+    """
+    Carga las fechas de `bloques` (DataFrames sucesivos del histórico, p. ej.
+    los chunks de read_csv) que no estén en la base. Una fecha puede venir
+    repartida en varios bloques.
+    """
+    ya = set(fechas_cargadas(con)) | {excluir}
+    filas = {}
+    for bloque in bloques:
+        sub = bloque[~bloque["fecha"].isin(ya)]
+        for fecha, df_fecha in sub.groupby("fecha", sort=True):
+            if fecha not in filas:
+                con.execute("DELETE FROM precios WHERE fecha = ?", (fecha,))
+                filas[fecha] = 0
+            _insertar(con, df_fecha)
+            filas[fecha] += len(df_fecha)
+    con.executemany("INSERT OR REPLACE INTO fechas (fecha, filas) VALUES (?, ?)", filas.items())
+    if filas:
+        print(f"  Índice SQLite: {len(filas)} fechas faltantes cargadas")
+
+
+def sincronizar(df_hoy, df_total=None, ruta=RUTA_DB):
+    """
+    Reemplaza en la base las filas de la fecha de df_hoy. Si se pasa
+    df_total (el histórico completo, o un iterable de bloques del histórico),
+    carga además las fechas que falten (primera corrida, o base borrada /
+    desactualizada).
+    """
+    fecha_hoy = df_hoy["fecha"].iloc[0]
+    con = conectar(ruta)
+    try:
+        with con:
+            if df_total is not None:
+                bloques = [df_total] if isinstance(df_total, pd.DataFrame) else df_total
+                _cargar_faltantes(con, bloques, fecha_hoy)
+            _reemplazar_fecha(con, fecha_hoy, df_hoy)
+    finally:
+        con.close()
+    print(f"  Índice SQLite sincronizado: {ruta} ({fecha_hoy})")
+
+
+def reconstruir(df_total, ruta=RUTA_DB):
+    ruta = Path(ruta)
+    if ruta.exists():
+        ruta.unlink()
+    con = conectar(ruta)
+    try:
+        with con:
+            for fecha, df_fecha in df_total.groupby("fecha", sort=True):
+                _reemplazar_fecha(con, fecha, df_fecha)
+    finally:
+        con.close()
+
+
+# ──────────────────────────────────────────────
+# Consultas
+# ──────────────────────────────────────────────
+def _fecha_ref(con, fecha_hoy, dias):
+    objetivo = (datetime.strptime(fecha_hoy, "%Y-%m-%d") - timedelta(days=dias)).strftime("%Y-%m-%d")
+    fila = con.execute("SELECT MAX(fecha) FROM fechas WHERE fecha <= ?", (objetivo,)).fetchone()
+    return fila[0]
+
+
+def ultima_fecha(con):
+    return con.execute("SELECT MAX(fecha) FROM fechas").fetchone()[0]
+
+
+def historial_sku(con, sku_id, desde=None):
+    sql = ("SELECT fecha, precio_actual, precio_regular, nombre FROM precios "
+           "WHERE sku_id = ? AND fecha >= ? ORDER BY fecha")
+    return pd.read_sql_query(sql, con, params=(str(sku_id), desde or ""))
+
+
+def variacion_categoria(con, cat_principal, dias, min_pct=None, fecha=None):
+    """SKUs de una cat_principal con su variación % contra hace `dias` días."""
+    fecha = fecha or ultima_fecha(con)
+    fecha_ref = _fecha_ref(con, fecha, dias) if fecha else None
+    if fecha_ref is None:
+        return pd.DataFrame(columns=["sku_id", "nombre", "marca", "precio_hoy", "precio_ref", "diff_pct"])
+    sql = """
+        SELECT h.sku_id, h.nombre, h.marca, h.precio_actual AS precio_hoy,
+               r.precio_actual AS precio_ref,
+               (h.precio_actual - r.precio_actual) / r.precio_actual * 100 AS diff_pct
+        FROM precios h
+        JOIN precios r ON r.sku_id = h.sku_id AND r.fecha = ?
+        WHERE h.fecha = ? AND h.cat_principal = ?
+          AND h.precio_actual > 0 AND r.precio_actual > 0
+    """
+    params = [fecha_ref, fecha, cat_principal]
+    if min_pct is not None:
+        sql += " AND (h.precio_actual - r.precio_actual) / r.precio_actual * 100 >= ?"
+        params.append(min_pct)
+    sql += " ORDER BY diff_pct DESC"
+    return pd.read_sql_query(sql, con, params=params)
+
+
+def productos_marca(con, marca, fecha=None):
+    fecha = fecha or ultima_fecha(con)
+    sql = ("SELECT sku_id, nombre, categoria, precio_actual, precio_regular FROM precios "
+           "WHERE marca = ? AND fecha = ? ORDER BY nombre")
+    return pd.read_sql_query(sql, con, params=(marca, fecha))
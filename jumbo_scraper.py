@@ -8,11 +8,24 @@ Usa la API VTEX Intelligent Search:
 OPTIMIZACIONES vs versión original:
   - ThreadPoolExecutor: scrappea N categorías en paralelo (WORKERS = 8)
   - Páginas de cada categoría también en paralelo (tras conocer el total)
-  - Delays mínimos entre páginas (el Retry con backoff cubre los 429)
+  - Delays mínimos entre páginas
+  - Reintentos con presupuesto global, circuit breaker por categoría y cola
+    de páginas diferidas que se reintentan una vez al final
   - Escritura thread-safe al CSV con threading.Lock
   - Estimación de tiempo restante en consola
+  - Feed de cambios vs. el día anterior mientras scrapea (feed_cambios.py)
+  - Varias tiendas (sales channel / región) en la misma pasada: el árbol de
+    categorías se baja una vez y cada (categoría, tienda) es una tarea más
+    del pool, con una sesión por tienda que comparte el pool de conexiones
+
+Uso:
+    python jumbo_scraper.py
+    python jumbo_scraper.py --contexto jumbo_sc2=sc:2
+    python jumbo_scraper.py --contexto cordoba=postalCode:5000,country:ARG
 """
 
+import argparse
+
 import requests
 import pandas as pd
 import time
@@ -24,6 +37,9 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+from analizar_precios_jumbo import TIENDA_BASE
+from feed_cambios import FeedCambios, cargar_precios_previos, clave_categoria
+
 BASE_URL   = "https://www.jumbo.com.ar"
 PAGE_SIZE  = 50
 MAX_PAGES  = 40          # 50 × 40 = 2 000 prods/cat
@@ -31,6 +47,25 @@ WORKERS    = 8           # categorías en paralelo  ← ajustá si hay 429s frec
 PAGE_DELAY = 0.3         # delay entre páginas de UNA categoría (era 1.5 s)
 OUTPUT_DIR = Path("output_jumbo")
 
+# Reintentos (ver PresupuestoReintentos / Circuito)
+REINTENTOS_PAGINA = 3        # reintentos por página, si queda presupuesto
+REINTENTOS_BASE   = 50       # presupuesto global de reintentos de la corrida...
+REINTENTOS_RATIO  = 0.1      # ...más 1 por cada 10 requests exitosos
+BACKOFF_BASE      = 1.0      # s, se duplica en cada reintento
+BACKOFF_MAX       = 10.0     # s, tope de cada espera (Retry-After incluido)
+FALLAS_CIRCUITO   = 3        # fallas seguidas que abren el circuito de una categoría
+STATUS_REINTENTABLES = {429, 500, 502, 503, 504}
+
+# Contextos de tienda de VTEX: nombre → campos públicos de la sesión
+# (sc = sales channel / política comercial, regionId, postalCode...).
+# TIENDA_BASE usa el contexto por defecto del sitio y es la que alimenta el
+# histórico; el resto se compara contra ella (comparacion_tiendas.json).
+# Las tiendas extra se agregan acá (y se eligen con --tiendas) o se definen
+# al vuelo con --contexto nombre=campo:valor[,campo:valor...].
+CONTEXTOS = {
+    TIENDA_BASE: {},
+}
+
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
                   "(KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
@@ -44,11 +79,18 @@ HEADERS = {
 # ──────────────────────────────────────────────
 def crear_sesion():
     s = requests.Session()
+    # Sólo fallas de conexión, con esperas cortas: los 429/5xx los maneja
+    # pedir_pagina con el presupuesto global y el circuit breaker. urllib3 no
+    # debe mirar Retry-After (con status=0 lo convertiría en RetryError sin
+    # respuesta): el 429/503 tiene que llegar a raise_for_status para _espera
     retry = Retry(
-        total=6,
-        backoff_factor=2,
-        status_forcelist=[429, 500, 502, 503, 504],
-        respect_retry_after_header=True,   # respeta el header Retry-After si lo manda Jumbo
+        total=2,
+        connect=2,
+        read=1,
+        status=0,
+        backoff_factor=0.5,
+        respect_retry_after_header=False,
+        raise_on_status=False,
     )
     s.mount("https://", HTTPAdapter(max_retries=retry, pool_connections=20, pool_maxsize=20))
     try:
@@ -58,6 +100,73 @@ def crear_sesion():
     return s
 
 
+def sesion_tienda(contexto, adaptador):
+    """
+    Sesión propia de una tienda, montada sobre el HTTPAdapter de la compartida
+    (mismo pool de conexiones). Su jar sólo tiene el vtex_segment del
+    contexto: pasarlo por request sobre el jar compartido mandaba también el
+    de la tienda base, primero, y VTEX respondía con el contexto por defecto.
+    Devuelve None si VTEX no entregó la cookie.
+    """
+    s = requests.Session()
+    s.mount("https://", adaptador)
+    publico = {k: {"value": str(v)} for k, v in contexto.items()}
+    r = s.post(f"{BASE_URL}/api/sessions", json={"public": publico},
+               headers=HEADERS, timeout=15)
+    r.raise_for_status()
+    return s if "vtex_segment" in s.cookies else None
+
+
+def parsear_contexto(texto):
+    """
+    "nombre=campo:valor[,campo:valor...]" de --contexto → (nombre, {campo: valor}).
+    Ej.: "jumbo_sc2=sc:2" o "cordoba=postalCode:5000,country:ARG".
+    """
+    nombre, _, campos = texto.partition("=")
+    nombre = nombre.strip()
+    pares = [c.partition(":") for c in campos.split(",")] if campos else []
+    if not nombre or not pares or any(not k.strip() or not sep or not v.strip() for k, sep, v in pares):
+        raise argparse.ArgumentTypeError(f"contexto inválido {texto!r}: "
+                                         "se espera nombre=campo:valor[,campo:valor...]")
+    if nombre == TIENDA_BASE:
+        raise argparse.ArgumentTypeError(f"{TIENDA_BASE} es la tienda base y usa el contexto por defecto")
+    return nombre, {k.strip(): v.strip() for k, _, v in pares}
+
+
+def agregar_args_tiendas(parser):
+    """--tiendas y --contexto, compartidos con pipeline_jumbo.py."""
+    parser.add_argument("--tiendas", nargs="+", choices=list(CONTEXTOS), default=[TIENDA_BASE],
+                        help=f"contextos de CONTEXTOS a scrapear (default: {TIENDA_BASE})")
+    parser.add_argument("--contexto", action="append", type=parsear_contexto, default=[],
+                        metavar="NOMBRE=CAMPO:VALOR[,...]",
+                        help="define y scrapea una tienda extra con esos campos de sesión de VTEX "
+                             "(p. ej. jumbo_sc2=sc:2); se puede repetir")
+
+
+def preparar_tiendas(nombres, session, contextos=CONTEXTOS):
+    """
+    [(nombre, sc, sesion)] de las tiendas que se pudieron inicializar;
+    sesion es None para la base, que usa la sesión compartida.
+    """
+    adaptador = session.get_adapter(BASE_URL)
+    tiendas = []
+    for nombre in nombres:
+        contexto = contextos[nombre]
+        if not contexto:
+            tiendas.append((nombre, None, None))
+            continue
+        try:
+            propia = sesion_tienda(contexto, adaptador)
+        except Exception as e:
+            print(f"[ERROR] Tienda {nombre}: no se pudo obtener el segmento ({e}); se omite")
+            continue
+        if propia is None:
+            print(f"[ERROR] Tienda {nombre}: VTEX no devolvió vtex_segment; se omite")
+            continue
+        tiendas.append((nombre, contexto.get("sc"), propia))
+    return tiendas
+
+
 # ──────────────────────────────────────────────
 # Árbol de categorías
 # ──────────────────────────────────────────────
@@ -89,19 +198,22 @@ def obtener_categorias(session):
 # ──────────────────────────────────────────────
 # Fetch de UNA página
 # ──────────────────────────────────────────────
-def _fetch_pagina(session, slug, desde):
+def _fetch_pagina(session, slug, desde, tienda=(TIENDA_BASE, None, None)):
+    _, sc, propia = tienda
     hasta = desde + PAGE_SIZE - 1
     url = (
         f"{BASE_URL}/api/io/_v/api/intelligent-search/product_search"
         f"/category-3/{slug}"
         f"?from={desde}&to={hasta}&sort=price%3Adesc"
     )
-    r = session.get(url, headers=HEADERS, timeout=30)
+    if sc:
+        url += f"&sc={sc}"
+    r = (propia or session).get(url, headers=HEADERS, timeout=30)
     r.raise_for_status()
     return r.json()
 
 
-def _parsear_prods(data, cat_principal, cat_padre, cat_nombre, slug):
+def _parsear_prods(data, cat_principal, cat_padre, cat_nombre, slug, tienda=TIENDA_BASE):
     fecha = datetime.now().strftime("%Y-%m-%d")
     filas = []
     for p in data.get("products", []):
@@ -131,25 +243,125 @@ def _parsear_prods(data, cat_principal, cat_padre, cat_nombre, slug):
                 "precio_regular": precio_regular,
                 "disponible":     offer.get("AvailableQuantity", 0),
                 "link":           f"{BASE_URL}{p.get('link', '')}",
+                "tienda":         tienda,
             })
     return filas
 
 
+# ──────────────────────────────────────────────
+# Reintentos: presupuesto global + circuit breaker por categoría
+# ──────────────────────────────────────────────
+class PresupuestoReintentos:
+    """
+    Reintentos disponibles para toda la corrida (compartido entre threads):
+    REINTENTOS_BASE más REINTENTOS_RATIO por request exitoso. Si el sitio
+    está caído el presupuesto se agota rápido y las páginas van directo a
+    la cola diferida en vez de dormir en backoff.
+    """
+
+    def __init__(self, base=REINTENTOS_BASE, ratio=REINTENTOS_RATIO):
+        self.base    = base
+        self.ratio   = ratio
+        self.exitos  = 0
+        self.usados  = 0
+        self.negados = 0
+        self.lock    = threading.Lock()
+
+    def exito(self):
+        with self.lock:
+            self.exitos += 1
+
+    def tomar(self):
+        with self.lock:
+            if self.usados < self.base + self.ratio * self.exitos:
+                self.usados += 1
+                return True
+            self.negados += 1
+            return False
+
+
+class CircuitoAbierto(Exception):
+    pass
+
+
+class Circuito:
+    """Circuit breaker de una categoría: tras FALLAS_CIRCUITO fallas seguidas no se piden más páginas."""
+
+    def __init__(self, umbral=FALLAS_CIRCUITO):
+        self.umbral  = umbral
+        self.fallas  = 0
+        self.abierto = False
+        self.lock    = threading.Lock()
+
+    def exito(self):
+        with self.lock:
+            self.fallas = 0
+
+    def falla(self):
+        with self.lock:
+            self.fallas += 1
+            if self.fallas >= self.umbral:
+                self.abierto = True
+
+
+def _reintentable(error):
+    r = getattr(error, "response", None)
+    return r is None or r.status_code in STATUS_REINTENTABLES
+
+
+def _espera(intento, error):
+    # Retry-After si lo manda el sitio (con tope); si no, backoff exponencial con jitter
+    r = getattr(error, "response", None)
+    retry_after = r.headers.get("Retry-After", "") if r is not None else ""
+    if retry_after.isdigit():
+        return min(float(retry_after), BACKOFF_MAX)
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (intento - 1)) * random.uniform(0.5, 1)
+
+
+def pedir_pagina(session, slug, desde, tienda, circuito, presupuesto, reintentos=REINTENTOS_PAGINA):
+    intento = 0
+    while True:
+        if circuito.abierto:
+            raise CircuitoAbierto(f"circuito abierto ({circuito.fallas} fallas seguidas)")
+        try:
+            data = _fetch_pagina(session, slug, desde, tienda)
+        except (requests.RequestException, ValueError) as e:
+            circuito.falla()
+            if (intento >= reintentos or not _reintentable(e) or circuito.abierto
+                    or not presupuesto.tomar()):
+                raise
+            intento += 1
+            time.sleep(_espera(intento, e))
+            continue
+        circuito.exito()
+        presupuesto.exito()
+        return data
+
+
 # ──────────────────────────────────────────────
 # Scrape completo de UNA categoría (páginas en paralelo)
 # ──────────────────────────────────────────────
-def scrape_categoria(slug, cat_nombre, cat_padre, cat_principal, session):
+def scrape_categoria(slug, cat_nombre, cat_padre, cat_principal, session,
+                     tienda=(TIENDA_BASE, None, None), presupuesto=None,
+                     reintentos=REINTENTOS_PAGINA):
+    """
+    Devuelve (prods, total_api, pendientes): pendientes son los offsets que
+    fallaron (0 = la primera página, o sea la categoría entera).
+    """
+    presupuesto = presupuesto or PresupuestoReintentos()
+    circuito    = Circuito()
+
     # 1) Primera página para saber el total
     try:
-        data0    = _fetch_pagina(session, slug, 0)
+        data0    = pedir_pagina(session, slug, 0, tienda, circuito, presupuesto, reintentos)
         total_api = data0.get("recordsFiltered", 0)
-        prods0    = _parsear_prods(data0, cat_principal, cat_padre, cat_nombre, slug)
+        prods0    = _parsear_prods(data0, cat_principal, cat_padre, cat_nombre, slug, tienda[0])
     except Exception as e:
         print(f"  [Error primera pág {slug}]: {e}")
-        return [], 0
+        return [], 0, [0]
 
     if total_api <= PAGE_SIZE:
-        return prods0, total_api
+        return prods0, total_api, []
 
     # 2) Páginas restantes en paralelo
     offsets = range(PAGE_SIZE, min(total_api, PAGE_SIZE * MAX_PAGES), PAGE_SIZE)
@@ -158,54 +370,115 @@ def scrape_categoria(slug, cat_nombre, cat_padre, cat_principal, session):
     def fetch_offset(desde):
         time.sleep(random.uniform(0, PAGE_DELAY))   # pequeño jitter para no explotar
         try:
-            data = _fetch_pagina(session, slug, desde)
-            return _parsear_prods(data, cat_principal, cat_padre, cat_nombre, slug)
+            data = pedir_pagina(session, slug, desde, tienda, circuito, presupuesto, reintentos)
+            return _parsear_prods(data, cat_principal, cat_padre, cat_nombre, slug, tienda[0])
+        except CircuitoAbierto:
+            return None
         except Exception as e:
             print(f"  [Error pág offset={desde} {slug}]: {e}")
-            return []
+            return None
 
     # Usamos un pool pequeño por categoría (no queremos recursión de pools)
+    pendientes = []
     with ThreadPoolExecutor(max_workers=4) as ppool:
-        for resultado in ppool.map(fetch_offset, offsets):
-            todos.extend(resultado)
-
-    return todos, total_api
+        for desde, resultado in zip(offsets, ppool.map(fetch_offset, offsets)):
+            if resultado is None:
+                pendientes.append(desde)
+            else:
+                todos.extend(resultado)
+    if circuito.abierto:
+        print(f"  [Circuito abierto {slug}]: {len(pendientes)} páginas diferidas")
+
+    return todos, total_api, pendientes
+
+
+def reintentar_diferida(session, cat, tienda, pendientes, presupuesto):
+    """
+    Un único intento más, al final de la corrida, para las páginas que
+    fallaron. Si había fallado la primera página se rehace la categoría
+    entera, sin reintentos. Devuelve (prods, total_api, pendientes).
+    """
+    cat_principal, cat_padre, cat_nombre, slug, _ = cat
+    if 0 in pendientes:
+        return scrape_categoria(slug, cat_nombre, cat_padre, cat_principal, session,
+                                tienda, presupuesto, reintentos=0)
+    prods, siguen = [], []
+    circuito = Circuito(umbral=len(pendientes) + 1)    # acá no se corta: es un solo intento por página
+    for desde in pendientes:
+        try:
+            data = pedir_pagina(session, slug, desde, tienda, circuito, presupuesto, reintentos=0)
+            prods += _parsear_prods(data, cat_principal, cat_padre, cat_nombre, slug, tienda[0])
+        except Exception as e:
+            print(f"  [Error diferida offset={desde} {slug}]: {e}")
+            siguen.append(desde)
+    return prods, None, siguen
 
 
 # ──────────────────────────────────────────────
-# Main
+# Scrape completo
 # ──────────────────────────────────────────────
-def main():
+def scrapear(tiendas=None, extra=None):
+    """
+    Scrape completo. Escribe output_jumbo/jumbo_<ts>.csv (auditoría y
+    compatibilidad con el analizador standalone) y devuelve además el
+    DataFrame con todas las filas, para usarlo en memoria sin releer el CSV.
+    Devuelve (df, csv_filename); df es None si no hubo categorías.
+
+    En paralelo escribe output_jumbo/cambios_<ts>.jsonl con los cambios
+    contra el último día del histórico (ver feed_cambios.py).
+
+    `tiendas` son nombres de CONTEXTOS y `extra` un {nombre: contexto} más
+    (de --contexto); todas se scrapean además de TIENDA_BASE y cada fila
+    lleva su tienda en la columna "tienda".
+    """
     OUTPUT_DIR.mkdir(exist_ok=True)
     ts           = datetime.now().strftime("%Y%m%d_%H%M%S")
     csv_filename = OUTPUT_DIR / f"jumbo_{ts}.csv"
     session      = crear_sesion()
     csv_lock     = threading.Lock()   # escritura thread-safe
 
+    print("Cargando precios del día anterior…")
+    fecha_ant, previos = cargar_precios_previos(datetime.now().strftime("%Y-%m-%d"))
+    if previos:
+        print(f"  {len(previos)} SKUs del {fecha_ant}")
+    else:
+        print("  Sin histórico previo: no se genera feed de cambios")
+
     print("Obteniendo árbol de categorías…")
     categorias = obtener_categorias(session)
     if not categorias:
         print("No se pudo obtener categorías. Abortando.")
-        return
-
-    total_cats  = len(categorias)
+        return None, csv_filename
+    # La tienda base va siempre: es la que alimenta el histórico
+    extra     = extra or {}
+    nombres   = dict.fromkeys([TIENDA_BASE, *(tiendas or []), *extra])
+    contextos = preparar_tiendas(list(nombres), session, {**CONTEXTOS, **extra})
+    feed = FeedCambios(OUTPUT_DIR / f"cambios_{ts}.jsonl", previos, fecha_ant) if previos else None
+
+    # Una tarea por (categoría, tienda), todas en el mismo pool de conexiones
+    tareas      = [(cat, tienda) for cat in categorias for tienda in contextos]
+    multi       = len(contextos) > 1
+    total_cats  = len(tareas)
     acum_skus   = 0
     completadas = 0
     t_inicio    = time.time()
 
     print(f"\n{'='*65}")
     print(f"  JUMBOBOT – Intelligent Search API  /category-3/{{slug}}")
-    print(f"  {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}  |  {total_cats} categorías  |  workers={WORKERS}")
+    print(f"  {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}  |  {len(categorias)} categorías"
+          f" × {len(contextos)} tienda(s)  |  workers={WORKERS}")
     print(f"{'='*65}\n")
 
-    lock_print = threading.Lock()
-    lock_acum  = threading.Lock()
-
-    def procesar(args):
-        nonlocal acum_skus, completadas
-        i, (cat_principal, cat_padre, cat_nombre, slug, cat_id) = args
+    lock_print  = threading.Lock()
+    lock_acum   = threading.Lock()
+    bloques     = []                  # un DataFrame por categoría
+    presupuesto = PresupuestoReintentos()
+    diferidas   = []                  # (categoría, tienda, offsets fallidos)
 
-        prods, total_api = scrape_categoria(slug, cat_nombre, cat_padre, cat_principal, session)
+    def guardar(prods, cat, tienda, completa):
+        nonlocal acum_skus
+        if feed and tienda[0] == TIENDA_BASE:
+            feed.registrar(prods, clave_categoria(cat[1], cat[2]), completa)
 
         # Escritura CSV thread-safe
         if prods:
@@ -213,18 +486,32 @@ def main():
             with csv_lock:
                 header = not csv_filename.exists()
                 df.to_csv(csv_filename, mode="a", index=False, header=header, encoding="utf-8-sig")
+                bloques.append(df)
+        with lock_acum:
+            acum_skus += len(prods)
+            return acum_skus
+
+    def procesar(args):
+        nonlocal completadas
+        i, (cat, tienda) = args
+        cat_principal, cat_padre, cat_nombre, slug, cat_id = cat
+
+        prods, total_api, pendientes = scrape_categoria(slug, cat_nombre, cat_padre, cat_principal,
+                                                        session, tienda, presupuesto)
+        if pendientes:
+            with lock_acum:
+                diferidas.append((cat, tienda, pendientes))
+        n_skus = guardar(prods, cat, tienda, completa=not pendientes)
 
         # Acumuladores y progreso
         with lock_acum:
-            acum_skus   += len(prods)
             completadas += 1
             n_comp       = completadas
-            n_skus       = acum_skus
 
         elapsed    = time.time() - t_inicio
         eta_s      = (elapsed / n_comp) * (total_cats - n_comp) if n_comp else 0
         eta_str    = f"{int(eta_s//60)}m{int(eta_s%60):02d}s"
-        label      = f"{cat_nombre[:30]} [{slug}]"
+        label      = f"{cat_nombre[:30]} [{slug}]" + (f" @{tienda[0]}" if multi else "")
 
         with lock_print:
             if prods:
@@ -234,13 +521,44 @@ def main():
                 print(f"[{i:03d}/{total_cats}] {label.ljust(50)} → sin datos  (API: {total_api})")
 
     with ThreadPoolExecutor(max_workers=WORKERS) as executor:
-        list(executor.map(procesar, enumerate(categorias, 1)))
+        list(executor.map(procesar, enumerate(tareas, 1)))
+
+    # Cola diferida: las páginas que fallaron se reintentan una vez, al final
+    if diferidas:
+        n_pags = sum(len(p) for _, _, p in diferidas)
+        print(f"\nReintentando {n_pags} páginas diferidas de {len(diferidas)} categorías…")
+
+        def recuperar(item):
+            cat, tienda, pendientes = item
+            prods, _, siguen = reintentar_diferida(session, cat, tienda, pendientes, presupuesto)
+            guardar(prods, cat, tienda, completa=not siguen)
+            return len(prods), not siguen
+
+        with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+            resultados = list(executor.map(recuperar, diferidas))
+        n_ok = sum(1 for _, ok in resultados if ok)
+        print(f"  Diferidas: {n_ok}/{len(diferidas)} categorías completadas · "
+              f"{sum(n for n, _ in resultados)} SKUs recuperados")
+    print(f"  Reintentos: {presupuesto.usados} usados, {presupuesto.negados} negados por presupuesto")
 
     elapsed_total = time.time() - t_inicio
     print(f"\n{'='*65}")
     print(f"  FIN · {acum_skus} SKUs · {int(elapsed_total//60)}m{int(elapsed_total%60):02d}s · {csv_filename}")
+    if feed:
+        feed.cerrar()
     print(f"{'='*65}")
 
+    if not bloques:
+        return pd.DataFrame(), csv_filename
+    return pd.concat(bloques, ignore_index=True), csv_filename
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scraper de precios Jumbo")
+    agregar_args_tiendas(parser)
+    args = parser.parse_args()
+    scrapear(args.tiendas, dict(args.contexto))
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,171 @@
+"""
+perfilador.py
+=============
+Perfilado por etapas para los scripts de JUMBOBOT.
+
+Cada etapa (y sub-etapa anidada) registra:
+  - tiempo de reloj (wall) y tiempo de CPU
+  - pico de RSS del proceso al cerrar la etapa y cuánto lo subió la etapa
+    (getrusage: no agrega costo)
+  - opcionalmente el pico de memoria Python/numpy de la etapa (tracemalloc).
+    Rastrear cada asignación hace el código 2-5x más lento, así que los
+    tiempos de una corrida con tracemalloc no sirven para comparar
+  - opcionalmente un volcado cProfile (.prof) por etapa de primer nivel
+
+Uso:
+    perfil = Perfilador(activo=True)        # tracemalloc=True para el pico Python por etapa
+    with perfil.etapa("graficos"):
+        with perfil.etapa("graficos_7d"):
+            ...
+    perfil.guardar(Path("data/perfil"))
+
+Con activo=False las etapas son no-op y no agregan costo.
+"""
+
+import cProfile
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:      # Windows
+    resource = None
+
+
+def pico_rss_mb():
+    """Pico de RSS del proceso hasta ahora, en MB (0 si la plataforma no lo informa)."""
+    if resource is None:
+        return 0.0
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo informa en KB, macOS en bytes
+    return pico / 1024 ** 2 if sys.platform == "darwin" else pico / 1024
+
+
+class Perfilador:
+    def __init__(self, activo=False, cprofile=False, dir_salida=None, tracemalloc=False):
+        self.activo     = activo
+        self.cprofile   = activo and cprofile
+        self.traza      = activo and tracemalloc
+        self.dir_salida = Path(dir_salida) if dir_salida else None
+        self.inicio     = datetime.now()
+        self.etapas     = []      # árbol de etapas ya cerradas (nivel 1)
+        self._pila      = []      # etapas abiertas
+
+    @contextmanager
+    def etapa(self, nombre, **extra):
+        if not self.activo:
+            yield
+            return
+
+        nodo = {"nombre": nombre, "_rss_ini": pico_rss_mb(), "etapas": []}
+        if self.traza:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            # El pico de tracemalloc es global: antes de abrir la sub-etapa
+            # guardamos el pico acumulado del padre y lo reseteamos.
+            if self._pila:
+                padre = self._pila[-1]
+                padre["_pico"] = max(padre["_pico"], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            nodo["_pico"]    = 0
+            nodo["_mem_ini"] = tracemalloc.get_traced_memory()[0]
+        if extra:
+            nodo["extra"] = extra
+        self._pila.append(nodo)
+
+        prof = None
+        if self.cprofile and len(self._pila) == 1:
+            prof = cProfile.Profile()
+            prof.enable()
+
+        t_wall = time.perf_counter()
+        t_cpu  = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - t_wall
+            cpu  = time.process_time() - t_cpu
+            if prof is not None:
+                prof.disable()
+
+            rss = pico_rss_mb()
+            self._pila.pop()
+
+            nodo["wall_s"]      = round(wall, 4)
+            nodo["cpu_s"]       = round(cpu, 4)
+            nodo["pico_rss_mb"] = round(rss, 2)
+            nodo["suba_rss_mb"] = round(rss - nodo.pop("_rss_ini"), 2)
+            if self.traza:
+                actual, pico = tracemalloc.get_traced_memory()
+                pico = max(pico, nodo.pop("_pico"))
+                nodo["pico_mem_mb"]  = round(pico / 1024 ** 2, 2)
+                nodo["delta_mem_mb"] = round((actual - nodo.pop("_mem_ini")) / 1024 ** 2, 2)
+            if prof is not None:
+                nodo["cprofile"] = self._volcar_cprofile(prof, nombre)
+            if not nodo["etapas"]:
+                del nodo["etapas"]
+
+            if self._pila:
+                padre = self._pila[-1]
+                padre["etapas"].append(nodo)
+                if self.traza:
+                    padre["_pico"] = max(padre["_pico"], pico)
+            else:
+                self.etapas.append(nodo)
+            if self.traza:
+                tracemalloc.reset_peak()
+
+    def _volcar_cprofile(self, prof, nombre):
+        if self.dir_salida is None:
+            return None
+        self.dir_salida.mkdir(parents=True, exist_ok=True)
+        ts   = self.inicio.strftime("%Y%m%d_%H%M%S")
+        ruta = self.dir_salida / f"perfil_{ts}_{nombre}.prof"
+        prof.dump_stats(ruta)
+        return str(ruta)
+
+    def reporte(self):
+        reporte = {
+            "inicio":       self.inicio.strftime("%Y-%m-%d %H:%M:%S"),
+            "tracemalloc":  self.traza,
+            "wall_total_s": round(sum(e["wall_s"] for e in self.etapas), 4),
+            "cpu_total_s":  round(sum(e["cpu_s"] for e in self.etapas), 4),
+            "pico_rss_mb":  max((e["pico_rss_mb"] for e in self.etapas), default=0),
+        }
+        if self.traza:
+            reporte["pico_mem_mb"] = max((e["pico_mem_mb"] for e in self.etapas), default=0)
+        reporte["etapas"] = self.etapas
+        return reporte
+
+    def guardar(self, dir_salida=None):
+        if not self.activo:
+            return None
+        dir_salida = Path(dir_salida or self.dir_salida)
+        dir_salida.mkdir(parents=True, exist_ok=True)
+        ruta = dir_salida / f"perfil_{self.inicio.strftime('%Y%m%d_%H%M%S')}.json"
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(self.reporte(), f, ensure_ascii=False, indent=2)
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        print(f"  Perfil guardado: {ruta}")
+        return ruta
+
+    def imprimir(self):
+        if not self.activo:
+            return
+
+        def _linea(nodo, nivel):
+            mem = (f"pico={nodo['pico_mem_mb']:8.1f}MB" if self.traza else
+                   f"rss={nodo['pico_rss_mb']:8.1f}MB (+{nodo['suba_rss_mb']:.1f})")
+            print(f"  {'  '*nivel}{nodo['nombre'].ljust(30 - 2*nivel)} "
+                  f"wall={nodo['wall_s']:8.3f}s  cpu={nodo['cpu_s']:8.3f}s  {mem}")
+            for hijo in nodo.get("etapas", []):
+                _linea(hijo, nivel + 1)
+
+        for e in self.etapas:
+            _linea(e, 0)
@@ -0,0 +1,78 @@
+"""
+pipeline_jumbo.py
+=================
+Corrida diaria completa en un solo proceso:
+
+    scraper → analizador → web
+
+Las filas del scraper pasan al analizador como DataFrame y las salidas del
+analizador pasan al generador web como dicts, sin releer el CSV ni los JSON
+(y sin arrancar tres intérpretes ni importar pandas tres veces). Los
+artefactos de siempre (output_jumbo/*.csv, data/*.json, docs/index.html) se
+siguen escribiendo para auditoría y para poder correr cada script por
+separado.
+
+Uso:
+    python pipeline_jumbo.py
+    python pipeline_jumbo.py --profile
+    python pipeline_jumbo.py --contexto jumbo_sc2=sc:2   # + comparacion_tiendas.json
+    python pipeline_jumbo.py --memoria-max 1500   # análisis y web por bloques, ≤ 1.5 GB
+"""
+
+import argparse
+import sys
+from datetime import datetime
+
+import analizar_precios_jumbo
+import generar_web_jumbo
+import jumbo_scraper
+from perfilador import Perfilador
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scraper + análisis + web de Jumbo en un proceso")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"registra tiempo y memoria por etapa en {analizar_precios_jumbo.DIR_PERFIL}/")
+    parser.add_argument("--cprofile", action="store_true",
+                        help="con --profile, vuelca además un .prof de cProfile por etapa")
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="con --profile, mide además el pico Python por etapa (mucho más lento)")
+    jumbo_scraper.agregar_args_tiendas(parser)
+    parser.add_argument("--memoria-max", type=int, default=None, metavar="MB",
+                        help="análisis y web sin cargar el histórico entero, sin superar MB "
+                             "(ver analisis_por_bloques.py)")
+    parser.add_argument("--rollup", action="store_true",
+                        help=f"calcula además los rollups por nivel en {analizar_precios_jumbo.DIR_ROLLUP}/")
+    args = parser.parse_args()
+
+    perfil = Perfilador(activo=args.profile, cprofile=args.cprofile,
+                        dir_salida=analizar_precios_jumbo.DIR_PERFIL, tracemalloc=args.tracemalloc)
+    print(f"\n{'='*60}")
+    print(f" PIPELINE JUMBO  ·  {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"{'='*60}\n")
+
+    with perfil.etapa("scraper"):
+        df_raw, csv_filename = jumbo_scraper.scrapear(args.tiendas, dict(args.contexto))
+    if df_raw is None or df_raw.empty:
+        print("ERROR: El scraper no devolvió productos.")
+        sys.exit(1)
+
+    try:
+        with perfil.etapa("analisis"):
+            salidas, df_hist = analizar_precios_jumbo.ejecutar_analisis(
+                df_raw, perfil, memoria_max=args.memoria_max, rollup=args.rollup)
+        del df_raw
+        with perfil.etapa("web"):
+            generar_web_jumbo.generar_web(salidas, df_hist=df_hist, memoria_max=args.memoria_max)
+    except MemoryError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+
+    if perfil.activo:
+        print("\nPerfil por etapa:")
+        perfil.imprimir()
+        perfil.guardar()
+
+
+if __name__ == "__main__":
+    main()